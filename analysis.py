@@ -0,0 +1,377 @@
+import logging
+import math
+import os
+import zlib
+from datetime import datetime
+
+import pandas as pd
+
+from cache import CachedTicker, history_dataset, history_refresh_start, merge_history
+from diagnostics import Instrumentation, InstrumentedTicker, payload_memory_bytes
+from earnings import parse_calendar
+from metrics import NEUTRAL_TREND, PRICE_TREND_RULES, PRICE_WINDOW_OFFSETS
+from pipeline import (DEFAULT_CHUNK_SIZE, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, HostRateLimiter,
+                      download_price_histories, fetch_all)
+from resilience import DEFAULT_RETRY_POLICY, CircuitBreaker, ResilientTicker
+from results import TickerResult
+
+logger = logging.getLogger(__name__)
+
+# Path to the stocks.xlsx file
+STOCKS_FILE_PATH = 'stocks.xlsx'  # Change this to the correct path if needed
+
+# Directory holding the plain-text symbol indexes built by load_symbol_index
+SYMBOL_INDEX_DIR = '.cache'
+
+# Function to read stock symbols from an .xlsx/.csv file with a 'Symbol' column, or a text file with one per line
+def load_symbols(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xls', '.csv'):
+        symbols_df = pd.read_csv(path) if extension == '.csv' else pd.read_excel(path)
+        if 'Symbol' not in symbols_df.columns:
+            raise ValueError("The file must contain a 'Symbol' column with stock tickers.")
+        return symbols_df['Symbol'].dropna().astype(str).tolist()
+    
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+# Function to read symbols from a plain-text index of `path`, rebuilt only when the file changes
+def load_symbol_index(path, index_dir=SYMBOL_INDEX_DIR):
+    """Same symbols as load_symbols(path), without re-parsing an unchanged spreadsheet.
+
+    The index's first line records the source's path, size and mtime; if any of
+    them differ the source is parsed again and the index rewritten atomically.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = f"# {path} {stat.st_size} {stat.st_mtime_ns}\n"
+    index_path = os.path.join(index_dir, f"{os.path.basename(path)}-{zlib.crc32(path.encode()):08x}.symbols.txt")
+    try:
+        with open(index_path) as f:
+            if f.readline() == signature:
+                return f.read().splitlines()
+    except OSError:
+        pass
+
+    symbols = load_symbols(path)
+    os.makedirs(index_dir, exist_ok=True)
+    temporary_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'w') as f:
+        f.write(signature)
+        f.writelines(f"{symbol}\n" for symbol in symbols)
+    os.replace(temporary_path, index_path)
+    return symbols
+
+# Function to derive the latest close and 1M/3M/1Y anchor prices from one 1-year history
+def compute_price_windows(historical_data, as_of=None):
+    """Return (latest close, 1M anchor, 3M anchor, 1Y anchor) from a single history frame.
+
+    Each anchor is the first close on or after the start of its window, which is
+    what ``history(period=...)`` returned when every window was fetched separately.
+    """
+    if historical_data is None or historical_data.empty:
+        return None, None, None, None
+    
+    closes = historical_data['Close']
+    tz = getattr(closes.index, 'tz', None)
+    as_of = pd.Timestamp.now(tz=tz) if as_of is None else pd.Timestamp(as_of)
+    if tz is not None and as_of.tzinfo is None:
+        as_of = as_of.tz_localize(tz)
+    
+    anchors = []
+    for offset in PRICE_WINDOW_OFFSETS.values():
+        window = closes[closes.index >= (as_of - offset).normalize()]
+        anchors.append(window.iloc[0] if not window.empty else None)
+    
+    return closes.iloc[-1], anchors[0], anchors[1], closes.iloc[0]
+
+# Function to classify the price trend from the 1M and 3M percent changes
+def classify_price_trend(price_change_1m, price_change_3m):
+    if price_change_1m is None or price_change_3m is None:
+        return "N/A"
+    for label, direction, threshold_1m, threshold_3m in PRICE_TREND_RULES:
+        if direction * price_change_1m > threshold_1m and direction * price_change_3m > threshold_3m:
+            return label
+    return NEUTRAL_TREND
+
+def _to_float(value):
+    # Statement cells and price math may yield None, numpy scalars or non-numeric values
+    try:
+        return math.nan if value is None else float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+# Function to derive the earnings expectation and confidence from the price trend and days until earnings
+def classify_earnings_expectation(price_trend, days_until_earnings):
+    if days_until_earnings <= 7:  # Earnings within 1 week
+        if "Uptrend" in price_trend:
+            return "Very Positive (Strong uptrend right before earnings)", "High"
+        elif "Downtrend" in price_trend:
+            return "Very Negative (Strong downtrend right before earnings)", "High"
+        else:
+            return "Neutral (No clear trend before earnings)", "Medium"
+    elif days_until_earnings <= 14:  # Earnings within 2 weeks
+        if "Uptrend" in price_trend:
+            return "Positive (Uptrend building before earnings)", "Medium-High"
+        elif "Downtrend" in price_trend:
+            return "Negative (Downtrend building before earnings)", "Medium-High"
+        else:
+            return "Neutral (No clear trend yet)", "Medium"
+    else:
+        return "Too early to predict (Earnings >2 weeks away)", "Low"
+
+# Function to fetch data for a given stock ticker
+def get_financial_data(ticker, stock=None, historical_data=None):
+    """Analyse one ticker, returning a TickerResult or None if no dataset could be fetched.
+
+    Each dataset is fetched independently; the ones that failed are listed in
+    `result.missing_datasets` and the fields derived from them are left unset.
+    """
+    # `stock` lets callers pass a wrapped (e.g. resilient or cached) yf.Ticker,
+    # `historical_data` a 1-year history that was already downloaded in a batch
+    if stock is None:
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+    result = TickerResult(ticker)
+    requested, missing = [], []
+
+    def fetch(dataset, load):
+        requested.append(dataset)
+        try:
+            return load()
+        except Exception as e:
+            logger.warning("Could not fetch %s for %s: %s", dataset, ticker, e)
+            missing.append(dataset)
+            return None
+
+    income_statement = fetch('financials', lambda: stock.financials)
+    balance_sheet = fetch('balance_sheet', lambda: stock.balance_sheet)
+    cash_flow = fetch('cashflow', lambda: stock.cashflow)
+    dividends = fetch('dividends', lambda: stock.dividends)
+    info = fetch('info', lambda: stock.info)
+    # A single 1-year history holds every window we need
+    historical_data_1y = historical_data if historical_data is not None else \
+        fetch('history', lambda: stock.history(period="1y"))
+    calendar = fetch('calendar', lambda: stock.calendar)
+
+    if historical_data is None and len(missing) == len(requested):
+        logger.error("Error fetching financial data for %s: every dataset failed", ticker)
+        return None
+    result.missing_datasets = tuple(missing)
+
+    latest_close_price = None
+    try:
+        latest_close_price, price_1m_ago, price_3m_ago, price_1y_ago = compute_price_windows(historical_data_1y)
+        
+        price_change_1m = ((latest_close_price - price_1m_ago) / price_1m_ago) * 100 if price_1m_ago and latest_close_price else None
+        price_change_3m = ((latest_close_price - price_3m_ago) / price_3m_ago) * 100 if price_3m_ago and latest_close_price else None
+        price_change_1y = ((latest_close_price - price_1y_ago) / price_1y_ago) * 100 if price_1y_ago and latest_close_price else None
+        
+        result.change_1m = _to_float(price_change_1m)
+        result.change_3m = _to_float(price_change_3m)
+        result.change_1y = _to_float(price_change_1y)
+        result.price_trend = classify_price_trend(price_change_1m, price_change_3m)
+        result.latest_close = _to_float(latest_close_price)
+        
+        # Store historical data for visualization
+        if historical_data_1y is not None and not historical_data_1y.empty:
+            result.historical_data = historical_data_1y
+        
+    except Exception as e:
+        logger.warning("Could not compute price data for %s: %s", ticker, e)
+
+    # Basic financial metrics
+    try:
+        result.net_income = _to_float(income_statement.loc['Net Income'].iloc[0])
+    except Exception:
+        pass
+        
+    try:
+        if 'Operating Income' in income_statement.index:
+            result.operating_income = _to_float(income_statement.loc['Operating Income'].iloc[0])
+        elif 'EBIT' in income_statement.index:
+            result.operating_income = _to_float(income_statement.loc['EBIT'].iloc[0])
+    except Exception:
+        pass
+    
+    try:
+        shares_outstanding = info['sharesOutstanding']
+        result.eps = _to_float(income_statement.loc['Net Income'].iloc[0] / shares_outstanding)
+    except Exception:
+        pass
+    
+    try:
+        result.revenue_growth = _to_float(income_statement.loc['Total Revenue'].pct_change().iloc[-1] * 100)
+    except Exception:
+        pass
+    
+    try:
+        result.retained_earnings = _to_float(balance_sheet.loc['Retained Earnings'].iloc[0])
+    except Exception:
+        pass
+        
+    try:
+        result.cash_reserves = _to_float(balance_sheet.loc['Cash'].iloc[0])
+    except Exception:
+        pass
+    
+    try:
+        debt = balance_sheet.loc['Total Debt'].iloc[0]
+        equity = balance_sheet.loc['Stockholders Equity'].iloc[0]
+        result.debt_to_equity = _to_float(debt / equity)
+    except Exception:
+        pass
+    
+    try:
+        assets = balance_sheet.loc['Total Assets'].iloc[0]
+        liabilities = balance_sheet.loc['Total Liabilities Net Minority Interest'].iloc[0]
+        result.working_capital = _to_float(assets - liabilities)
+    except Exception:
+        pass
+    
+    try:
+        if 'dividendYield' in info:
+            result.dividend_yield = _to_float(info.get('dividendYield', 0) * 100)
+    except Exception:
+        pass
+    
+    try:
+        result.free_cash_flow = _to_float(cash_flow.loc['Free Cash Flow'].iloc[0])
+    except Exception:
+        pass
+    
+    # Dividend information
+    if dividends is not None and not dividends.empty:
+        try:
+            result.dividend_growth = _to_float(dividends.pct_change().mean() * 100)
+        except Exception:
+            pass
+        
+        try:
+            predicted_dividend_amount = float(dividends.iloc[-1])
+            if latest_close_price is not None:
+                result.dividend_percentage = _to_float(predicted_dividend_amount / float(latest_close_price) * 100)
+            
+            past_dividends = dividends.tail(4)  # Last 4 dividends
+            result.past_dividends = tuple(float(x) for x in past_dividends.tolist())
+            
+            date_diffs = past_dividends.index.to_series().diff().dropna()
+            if not date_diffs.empty:
+                avg_diff = date_diffs.mean()
+                last_dividend_date = past_dividends.index[-1]
+                next_dividend_date = (last_dividend_date + avg_diff).date()
+                result.next_dividend_date = next_dividend_date
+                result.days_until_dividend = float((next_dividend_date - datetime.now().date()).days)
+
+            result.predicted_dividend = predicted_dividend_amount
+        except Exception:
+            result.next_dividend_date = None
+            result.days_until_dividend = math.nan
+            result.predicted_dividend = math.nan
+            result.dividend_percentage = math.nan
+            result.past_dividends = ()
+
+    # Earnings information
+    try:
+        earnings_date = parse_calendar(calendar)['earnings']
+        if earnings_date is not None:
+            days_until_earnings = (earnings_date - datetime.now().date()).days
+            
+            result.next_earnings_date = earnings_date
+            result.days_until_earnings = float(days_until_earnings)
+            
+            # Determine expectation based on price trend and days until earnings
+            result.earnings_expectation, result.earnings_confidence = \
+                classify_earnings_expectation(result.price_trend, days_until_earnings)
+    except Exception:
+        result.next_earnings_date = None
+        result.days_until_earnings = math.nan
+
+    return result
+
+# Function to download or top up many tickers' price histories in a few multi-ticker requests
+def _batch_price_histories(tickers, period, cache, force_refresh, chunk_size, limiter, instrumentation, on_status):
+    """Return {ticker: `period` history} for the tickers whose history needs fetching.
+
+    Tickers with nothing stored (every ticker without a cache or on a forced refresh) get
+    the whole period. Expired stored series get only the bars since their last completed
+    bar, from one download starting at the earliest such bar, merged the way CachedTicker
+    merges them; those the new bars invalidate are downloaded in full. Fresh series are
+    left to the cache, and tickers missing from a download to the per-ticker fetch.
+    """
+    dataset = history_dataset(period=period)
+    states = {ticker: 'missing' if cache is None or force_refresh else cache.entry_state(ticker, dataset)
+              for ticker in tickers}
+    stored = {ticker: cache.peek(ticker, dataset) for ticker in tickers if states[ticker] == 'expired'}
+    stored = {ticker: history for ticker, history in stored.items() if history is not None and not history.empty}
+    missing = [ticker for ticker in tickers if states[ticker] == 'missing' or
+               (states[ticker] == 'expired' and ticker not in stored)]
+
+    def download(group, message, **window):
+        if on_status is not None:
+            on_status(message)
+        with instrumentation.stage('batch_prices'):
+            frames = download_price_histories(group, chunk_size=chunk_size, limiter=limiter, **window)
+        instrumentation.record_request('history_batch', sum(payload_memory_bytes(frame) for frame in frames.values()))
+        return frames
+
+    histories = {}
+    if stored:
+        starts = {ticker: history_refresh_start(history) for ticker, history in stored.items()}
+        new_bars = download(list(stored), f"Updating prices for {len(stored)} stocks...",
+                            start=min(starts.values()).strftime('%Y-%m-%d'))
+        for ticker, frame in new_bars.items():
+            merged = merge_history(stored[ticker], frame[frame.index >= starts[ticker]], period)
+            if merged is None:
+                missing.append(ticker)
+            else:
+                cache.record_update(dataset)
+                histories[ticker] = merged
+    if missing:
+        histories.update(download(missing, f"Downloading prices for {len(missing)} stocks...", period=period))
+
+    if cache is not None:
+        for ticker, history in histories.items():
+            cache.put(ticker, dataset, history)
+    return histories
+
+# Function to analyse many tickers: batched prices first, then concurrent per-ticker fundamentals
+def run_analysis(tickers, max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 cache=None, force_refresh=False, batch_prices=True, chunk_size=DEFAULT_CHUNK_SIZE,
+                 on_complete=None, on_status=None, instrumentation=None, profiler=None,
+                 retry_policy=DEFAULT_RETRY_POLICY):
+    """Run get_financial_data over `tickers` and return the results in input order.
+
+    Failed tickers come back as None, partially fetched ones with `missing_datasets` set.
+    Dataset requests are retried per `retry_policy` and share one circuit breaker. `on_complete(done, total, ticker, result)` is called
+    from the calling thread as each ticker finishes; `on_status(message)` for stage changes.
+    `instrumentation` (diagnostics.Instrumentation) collects timings and request counts;
+    `profiler` (from diagnostics.profiled) extends profiling to the worker threads.
+    """
+    tickers = list(tickers)
+    limiter = HostRateLimiter(requests_per_second)
+    breaker = CircuitBreaker()
+    instrumentation = instrumentation or Instrumentation()
+    
+    histories = {}
+    if batch_prices:
+        histories = _batch_price_histories(tickers, "1y", cache, force_refresh, chunk_size, limiter, instrumentation,
+                                           on_status)
+    
+    # Imported on first use so app startup and symbol loading don't pay for yfinance
+    import yfinance as yf
+
+    def fetch_ticker(ticker):
+        stock = ResilientTicker(InstrumentedTicker(yf.Ticker(ticker), instrumentation), limiter, breaker,
+                                retry_policy, instrumentation)
+        if cache is not None:
+            stock = CachedTicker(stock, cache, force_refresh=force_refresh)
+        with instrumentation.stage('analysis', ticker):
+            return get_financial_data(ticker, stock=stock, historical_data=histories.get(ticker))
+    
+    if profiler is not None:
+        fetch_ticker = profiler.wrap(fetch_ticker)
+    
+    if on_status is not None:
+        on_status(f"Fetching {len(tickers)} stocks with up to {max_workers} workers...")
+    return fetch_all(tickers, fetch_ticker, max_workers=max_workers, on_complete=on_complete)
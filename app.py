@@ -1,293 +1,184 @@
-import yfinance as yf
+import io
 import pandas as pd
 import os
-from openpyxl import load_workbook
+import time
 import streamlit as st
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
+from datetime import datetime
 
-# Path to the stocks.xlsx file
-STOCKS_FILE_PATH = 'stocks.xlsx'  # Change this to the correct path if needed
+from analysis import STOCKS_FILE_PATH, load_symbol_index, run_analysis
+from backtest import FORWARD_HORIZONS, run_backtest
+from cache import CACHE_PATH, DiskCache
+from charts import downsample_closes
+from diagnostics import Instrumentation, profiled
+from earnings import build_calendar_index
+from pipeline import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND
+from results import (format_date, format_days, format_money, format_number, format_percent, format_ratio,
+                     results_to_frame, sign_class)
+from snapshot import current_version, read_snapshot, snapshot_metrics
+from store import RunStore
 
-# Function to fetch data for a given stock ticker
-def get_financial_data(ticker):
-    stock = yf.Ticker(ticker)
-    result = {'Ticker': ticker}
-    
-    try:
-        income_statement = stock.financials
-        balance_sheet = stock.balance_sheet
-        cash_flow = stock.cashflow
-        dividends = stock.dividends
-        info = stock.info
-    except Exception as e:
-        st.error(f"Error fetching financial data for {ticker}: {e}")
-        return None
+# Shared on-disk cache of yfinance datasets, kept alive across reruns
+@st.cache_resource
+def get_disk_cache():
+    return DiskCache()
 
-    try:
-        # Get historical data for different time periods
-        historical_data_1m = stock.history(period="1mo")
-        historical_data_3m = stock.history(period="3mo")
-        historical_data_1d = stock.history(period="1d")
-        historical_data_1y = stock.history(period="1y")
-        
-        latest_close_price = historical_data_1d['Close'].iloc[-1] if not historical_data_1d.empty else None
-        
-        # Calculate price trends
-        price_1m_ago = historical_data_1m['Close'].iloc[0] if not historical_data_1m.empty else None
-        price_3m_ago = historical_data_3m['Close'].iloc[0] if not historical_data_3m.empty else None
-        price_1y_ago = historical_data_1y['Close'].iloc[0] if not historical_data_1y.empty else None
-        
-        price_change_1m = ((latest_close_price - price_1m_ago) / price_1m_ago) * 100 if price_1m_ago and latest_close_price else None
-        price_change_3m = ((latest_close_price - price_3m_ago) / price_3m_ago) * 100 if price_3m_ago and latest_close_price else None
-        price_change_1y = ((latest_close_price - price_1y_ago) / price_1y_ago) * 100 if price_1y_ago and latest_close_price else None
-        
-        result['1M Price Change'] = f"{price_change_1m:.2f}%" if price_change_1m is not None else "N/A"
-        result['3M Price Change'] = f"{price_change_3m:.2f}%" if price_change_3m is not None else "N/A"
-        result['1Y Price Change'] = f"{price_change_1y:.2f}%" if price_change_1y is not None else "N/A"
-        
-        # Determine price trend
-        price_trend = "N/A"
-        if price_change_1m is not None and price_change_3m is not None:
-            if price_change_1m > 10 and price_change_3m > 20:
-                price_trend = "Very Strong Uptrend"
-            elif price_change_1m > 5 and price_change_3m > 10:
-                price_trend = "Strong Uptrend"
-            elif price_change_1m > 2 and price_change_3m > 5:
-                price_trend = "Moderate Uptrend"
-            elif price_change_1m < -10 and price_change_3m < -20:
-                price_trend = "Very Strong Downtrend"
-            elif price_change_1m < -5 and price_change_3m < -10:
-                price_trend = "Strong Downtrend"
-            elif price_change_1m < -2 and price_change_3m < -5:
-                price_trend = "Moderate Downtrend"
-            else:
-                price_trend = "Neutral Trend"
-                
-        result['Price Trend'] = price_trend
-        
-        # Store historical data for visualization
-        result['Historical Data'] = historical_data_1y if not historical_data_1y.empty else None
-        
-    except Exception as e:
-        st.warning(f"Could not fetch complete price data for {ticker}: {e}")
-        latest_close_price = None
-        result['1M Price Change'] = "N/A"
-        result['3M Price Change'] = "N/A"
-        result['1Y Price Change'] = "N/A"
-        result['Price Trend'] = "N/A"
-        result['Historical Data'] = None
-
-    # Basic financial metrics
-    try:
-        result['Net Income'] = income_statement.loc['Net Income'].iloc[0] if 'Net Income' in income_statement.index else "N/A"
-    except:
-        result['Net Income'] = "N/A"
-        
-    try:
-        result['Operating Income'] = income_statement.loc['Operating Income'].iloc[0] if 'Operating Income' in income_statement.index else \
-                                   income_statement.loc['EBIT'].iloc[0] if 'EBIT' in income_statement.index else "N/A"
-    except:
-        result['Operating Income'] = "N/A"
-    
-    try:
-        shares_outstanding = info['sharesOutstanding']
-        eps = income_statement.loc['Net Income'].iloc[0] / shares_outstanding
-        result['EPS'] = f"${eps:.2f}"
-    except:
-        result['EPS'] = "N/A"
-    
-    try:
-        revenue_growth = income_statement.loc['Total Revenue'].pct_change().iloc[-1] * 100
-        result['Revenue Growth'] = f"{revenue_growth:.2f}%"
-    except:
-        result['Revenue Growth'] = "N/A"
-    
-    try:
-        result['Retained Earnings'] = balance_sheet.loc['Retained Earnings'].iloc[0] if 'Retained Earnings' in balance_sheet.index else "N/A"
-    except:
-        result['Retained Earnings'] = "N/A"
-        
-    try:
-        result['Cash Reserves'] = balance_sheet.loc['Cash'].iloc[0] if 'Cash' in balance_sheet.index else "N/A"
-    except:
-        result['Cash Reserves'] = "N/A"
-    
-    try:
-        debt = balance_sheet.loc['Total Debt'].iloc[0]
-        equity = balance_sheet.loc['Stockholders Equity'].iloc[0]
-        result['Debt-to-Equity Ratio'] = f"{debt/equity:.2f}"
-    except:
-        result['Debt-to-Equity Ratio'] = "N/A"
-    
-    try:
-        assets = balance_sheet.loc['Total Assets'].iloc[0]
-        liabilities = balance_sheet.loc['Total Liabilities Net Minority Interest'].iloc[0]
-        result['Working Capital'] = f"${assets - liabilities:,.2f}"
-    except:
-        result['Working Capital'] = "N/A"
-    
-    try:
-        result['Dividend Yield'] = f"{info.get('dividendYield', 0) * 100:.2f}%" if 'dividendYield' in info else "N/A"
-    except:
-        result['Dividend Yield'] = "N/A"
-    
-    try:
-        result['Free Cash Flow'] = cash_flow.loc['Free Cash Flow'].iloc[0] if 'Free Cash Flow' in cash_flow.index else "N/A"
-    except:
-        result['Free Cash Flow'] = "N/A"
-    
-    # Dividend information
-    if not dividends.empty:
-        try:
-            result['Dividend Growth Rate'] = f"{dividends.pct_change().mean() * 100:.2f}%"
-        except:
-            result['Dividend Growth Rate'] = "N/A"
-    else:
-        result['Dividend Growth Rate'] = "N/A"
-    
-    result['Latest Close Price'] = f"${latest_close_price:.2f}" if latest_close_price is not None else "N/A"
-    
-    if not dividends.empty:
+# Shared append-only store of analysis runs
+@st.cache_resource
+def get_run_store():
+    return RunStore()
+
+# Symbols parsed once per version of the file; a new mtime means a new cache entry.
+# Across restarts the on-disk index spares re-reading the spreadsheet.
+@st.cache_data
+def get_symbol_options(path, mtime):
+    return load_symbol_index(path)
+
+# Latest snapshot written by scheduler.py; a new version means a new cache entry
+@st.cache_resource(max_entries=1)
+def get_snapshot(version):
+    return read_snapshot(version)
+
+# Function to describe an age in seconds as e.g. "3h 12m"
+def format_age(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes}m" if hours < 48 else f"{hours // 24}d {hours % 24}h"
+
+# Number of per-stock detail panels rendered at a time
+RESULTS_PER_PAGE = 10
+
+# Number of most recent runs listed in Run History
+RUN_HISTORY_LIMIT = 20
+
+# Function to offer an Excel download that is only built once asked for. The workbook is
+# kept in the session under `slot` while `identity` (what it was built from) is unchanged.
+def render_excel_download(slot, identity, export, label):
+    prepared = st.session_state.get(f'{slot}_export')
+    if prepared is None or prepared[0] != identity:
+        if not st.button("Prepare Excel file", key=f'{slot}_prepare'):
+            return
+        buffer = io.BytesIO()
         try:
-            predicted_dividend_amount = dividends.iloc[-1]
-            if latest_close_price is not None:
-                dividend_percentage = (predicted_dividend_amount / float(latest_close_price)) * 100
-                result['Dividend Percentage'] = f"{dividend_percentage:.2f}%"
-            
-            past_dividends = dividends.tail(4)  # Last 4 dividends
-            result['Past Dividends'] = [f"${x:.2f}" for x in past_dividends.tolist()]
-            
-            date_diffs = past_dividends.index.to_series().diff().dropna()
-            if not date_diffs.empty:
-                avg_diff = date_diffs.mean()
-                last_dividend_date = past_dividends.index[-1]
-                next_dividend_date = last_dividend_date + avg_diff
-                result['Next Dividend Date'] = str(next_dividend_date.date())
-                result['Days Until Dividend'] = (next_dividend_date.date() - datetime.now().date()).days
-            else:
-                result['Next Dividend Date'] = 'N/A'
-                result['Days Until Dividend'] = 'N/A'
-
-            result['Predicted Dividend Amount'] = f"${predicted_dividend_amount:.2f}"
-        except:
-            result['Next Dividend Date'] = 'N/A'
-            result['Days Until Dividend'] = 'N/A'
-            result['Predicted Dividend Amount'] = 'N/A'
-            result['Dividend Percentage'] = "N/A"
-            result['Past Dividends'] = []
-    else:
-        result['Next Dividend Date'] = 'N/A'
-        result['Days Until Dividend'] = 'N/A'
-        result['Predicted Dividend Amount'] = 'N/A'
-        result['Dividend Percentage'] = "N/A"
-        result['Past Dividends'] = []
+            export(buffer)
+        except Exception as e:
+            st.error(f"Error exporting to Excel: {e}")
+            return
+        prepared = st.session_state[f'{slot}_export'] = (identity, buffer.getvalue())
+    st.download_button(label, prepared[1], file_name="dividend_predictions.xlsx", key=f'{slot}_download',
+                       mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
 
-    # Earnings information
-    try:
-        earnings_dates = stock.calendar
-        if earnings_dates is not None and not earnings_dates.empty:
-            next_earnings = earnings_dates.iloc[0]
-            result['Next Earnings Date'] = str(next_earnings.name.date())
-            
-            # Calculate days until earnings
-            today = datetime.now().date()
-            earnings_date = next_earnings.name.date()
-            days_until_earnings = (earnings_date - today).days
-            
-            result['Days Until Earnings'] = days_until_earnings
-            
-            # Determine expectation based on price trend and days until earnings
-            if days_until_earnings <= 7:  # Earnings within 1 week
-                if "Uptrend" in price_trend:
-                    result['Earnings Expectation'] = "Very Positive (Strong uptrend right before earnings)"
-                    result['Earnings Confidence'] = "High"
-                elif "Downtrend" in price_trend:
-                    result['Earnings Expectation'] = "Very Negative (Strong downtrend right before earnings)"
-                    result['Earnings Confidence'] = "High"
-                else:
-                    result['Earnings Expectation'] = "Neutral (No clear trend before earnings)"
-                    result['Earnings Confidence'] = "Medium"
-            elif days_until_earnings <= 14:  # Earnings within 2 weeks
-                if "Uptrend" in price_trend:
-                    result['Earnings Expectation'] = "Positive (Uptrend building before earnings)"
-                    result['Earnings Confidence'] = "Medium-High"
-                elif "Downtrend" in price_trend:
-                    result['Earnings Expectation'] = "Negative (Downtrend building before earnings)"
-                    result['Earnings Confidence'] = "Medium-High"
-                else:
-                    result['Earnings Expectation'] = "Neutral (No clear trend yet)"
-                    result['Earnings Confidence'] = "Medium"
-            else:
-                result['Earnings Expectation'] = "Too early to predict (Earnings >2 weeks away)"
-                result['Earnings Confidence'] = "Low"
-        else:
-            result['Next Earnings Date'] = "N/A"
-            result['Days Until Earnings'] = "N/A"
-            result['Earnings Expectation'] = "N/A"
-            result['Earnings Confidence'] = "N/A"
-    except Exception as e:
-        result['Next Earnings Date'] = "N/A"
-        result['Days Until Earnings'] = "N/A"
-        result['Earnings Expectation'] = "N/A"
-        result['Earnings Confidence'] = "N/A"
-
-    return result
-
-# Function to save results to an Excel file
-def save_to_excel(results, filename="dividend_predictions.xlsx"):
-    try:
-        # Prepare data for DataFrame
-        data_for_excel = []
-        for result in results:
-            row = {
-                'Ticker': result['Ticker'],
-                'Latest Price': result['Latest Close Price'],
-                '1M Change': result['1M Price Change'],
-                '3M Change': result['3M Price Change'],
-                '1Y Change': result['1Y Price Change'],
-                'Price Trend': result['Price Trend'],
-                'Net Income': result['Net Income'],
-                'EPS': result['EPS'],
-                'Revenue Growth': result['Revenue Growth'],
-                'Debt-to-Equity': result['Debt-to-Equity Ratio'],
-                'Dividend Yield': result['Dividend Yield'],
-                'Next Dividend Date': result['Next Dividend Date'],
-                'Predicted Dividend': result['Predicted Dividend Amount'],
-                'Next Earnings Date': result['Next Earnings Date'],
-                'Days Until Earnings': result['Days Until Earnings'],
-                'Earnings Expectation': result['Earnings Expectation'],
-                'Earnings Confidence': result['Earnings Confidence']
-            }
-            data_for_excel.append(row)
-        
-        results_df = pd.DataFrame(data_for_excel)
-        
-        if os.path.exists(filename):
-            book = load_workbook(filename)
-            with pd.ExcelWriter(filename, engine='openpyxl') as writer:
-                writer.book = book
-                results_df.to_excel(writer, index=False, sheet_name='New Results')
-            st.success(f"Results appended to {filename}")
+# Function to render the metric cards and chart for one stock
+def render_ticker_details(result):
+    if result.missing_datasets:
+        st.warning(f"Partial result: could not fetch {', '.join(result.missing_datasets)}.")
+
+    # Create columns for layout
+    col1, col2 = st.columns([2, 3])
+
+    with col1:
+        # Key metrics
+        st.markdown("### Key Metrics")
+
+        # Price information
+        st.markdown(f"""
+            <div class="metric-card">
+                <b>Latest Price:</b> {format_money(result.latest_close)}<br>
+                <b>1M Change:</b> <span class="{sign_class(result.change_1m)}">{format_percent(result.change_1m)}</span><br>
+                <b>3M Change:</b> <span class="{sign_class(result.change_3m)}">{format_percent(result.change_3m)}</span><br>
+                <b>1Y Change:</b> <span class="{sign_class(result.change_1y)}">{format_percent(result.change_1y)}</span><br>
+                <b>Price Trend:</b> <span class="{'positive' if 'Uptrend' in result.price_trend else 'negative' if 'Downtrend' in result.price_trend else 'neutral'}">{result.price_trend}</span>
+            </div>
+        """, unsafe_allow_html=True)
+
+        # Dividend information
+        st.markdown("### Dividend Information")
+        st.markdown(f"""
+            <div class="metric-card">
+                <b>Dividend Yield:</b> {format_percent(result.dividend_yield)}<br>
+                <b>Next Dividend Date:</b> {format_date(result.next_dividend_date)}<br>
+                <b>Days Until Dividend:</b> {format_days(result.days_until_dividend)}<br>
+                <b>Predicted Amount:</b> {format_money(result.predicted_dividend)}<br>
+                <b>Dividend Growth Rate:</b> {format_percent(result.dividend_growth)}<br>
+                <b>Past Dividends:</b> {', '.join(format_money(x) for x in result.past_dividends) if result.past_dividends else 'N/A'}
+            </div>
+        """, unsafe_allow_html=True)
+
+        # Earnings information
+        st.markdown("### Earnings Information")
+        st.markdown(f"""
+            <div class="metric-card">
+                <b>Next Earnings Date:</b> {format_date(result.next_earnings_date)}<br>
+                <b>Days Until Earnings:</b> {format_days(result.days_until_earnings)}<br>
+                <b>Expectation:</b> <span class="{'positive' if 'Positive' in result.earnings_expectation else 'negative' if 'Negative' in result.earnings_expectation else 'neutral'}">{result.earnings_expectation}</span><br>
+                <b>Confidence:</b> {result.earnings_confidence}
+            </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        # Financial metrics
+        st.markdown("### Financial Metrics")
+        st.markdown(f"""
+            <div class="metric-card">
+                <b>EPS:</b> {format_money(result.eps)}<br>
+                <b>Net Income:</b> {format_number(result.net_income)}<br>
+                <b>Operating Income:</b> {format_number(result.operating_income)}<br>
+                <b>Revenue Growth:</b> {format_percent(result.revenue_growth)}<br>
+                <b>Free Cash Flow:</b> {format_number(result.free_cash_flow)}<br>
+                <b>Cash Reserves:</b> {format_number(result.cash_reserves)}<br>
+                <b>Retained Earnings:</b> {format_number(result.retained_earnings)}<br>
+                <b>Working Capital:</b> {format_money(result.working_capital, grouped=True)}<br>
+                <b>Debt-to-Equity:</b> {format_ratio(result.debt_to_equity)}
+            </div>
+        """, unsafe_allow_html=True)
+
+        # Interactive price chart, thinned to a few points per week
+        st.markdown("### Price Performance")
+        closes = downsample_closes(result.historical_data)
+        if closes is not None:
+            st.line_chart(closes, height=250)
         else:
-            results_df.to_excel(filename, index=False)
-            st.success(f"Results saved to new file {filename}")
-    except Exception as e:
-        st.error(f"Error saving to Excel: {e}")
-
-# Function to plot stock performance
-def plot_stock_performance(ticker, historical_data):
-    if historical_data is None or historical_data.empty:
-        return None
-    
-    plt.figure(figsize=(10, 5))
-    plt.plot(historical_data.index, historical_data['Close'], label='Closing Price')
-    plt.title(f'{ticker} 1-Year Performance')
-    plt.xlabel('Date')
-    plt.ylabel('Price ($)')
-    plt.grid(True)
-    plt.legend()
-    return plt
+            st.warning("No historical price data available for chart")
+
+# Summary table first, then detail panels one page at a time. As a fragment,
+# paging reruns only this function instead of the whole script.
+@st.fragment
+def render_results(all_results):
+    st.markdown("## Summary")
+    st.dataframe(results_to_frame(all_results), hide_index=True)
+
+    page_count = -(-len(all_results) // RESULTS_PER_PAGE)
+    page = st.number_input(f"Details page (of {page_count})", min_value=1, max_value=page_count, value=1) if page_count > 1 else 1
+    for result in all_results[(page - 1) * RESULTS_PER_PAGE:page * RESULTS_PER_PAGE]:
+        with st.expander(f"{result.ticker} Analysis", expanded=len(all_results) == 1):
+            render_ticker_details(result)
+
+# Function to show where the last fetch spent its time
+def render_diagnostics(diagnostics, render_seconds, profile_path=None):
+    with st.expander("Diagnostics"):
+        cache_stats = diagnostics.get('cache', {})
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Fetch time", f"{diagnostics['wall_seconds']:.1f} s")
+        col2.metric("Requests", diagnostics['total_requests'])
+        col3.metric("Payload in memory", f"{diagnostics['total_payload_bytes'] / 1024 / 1024:.1f} MB",
+                    help="Size of the fetched data once loaded, not bytes sent over the network")
+        col4.metric("Retries", diagnostics['total_retries'])
+        col5.metric("Cache hit rate", f"{cache_stats.get('hit_rate', 0):.0%}")
+        st.write(f"Rendering this page took {render_seconds:.2f} s")
+
+        st.markdown("**Time per stage** (seconds, summed over worker threads)")
+        st.dataframe(pd.DataFrame(diagnostics['stages']).T)
+        st.markdown("**Slowest tickers** (seconds)")
+        st.dataframe(pd.Series(diagnostics['slowest_tickers'], name='seconds'))
+        if diagnostics['requests']:
+            st.markdown("**Requests reaching Yahoo Finance**")
+            st.dataframe(pd.DataFrame({'requests': diagnostics['requests'],
+                                       'payload bytes in memory': diagnostics['payload_bytes']}))
+
+        if profile_path and os.path.exists(profile_path):
+            with open(profile_path, 'rb') as f:
+                st.download_button("Download cProfile stats", f.read(), file_name=os.path.basename(profile_path))
 
 # Streamlit App
 st.set_page_config(page_title="Stock Dividend Predictions", layout="wide")
@@ -333,118 +224,209 @@ st.title('Stock Dividend Prediction and Financial Analysis')
 
 # Read the stock symbols from the local stocks.xlsx file
 if os.path.exists(STOCKS_FILE_PATH):
-    symbols_df = pd.read_excel(STOCKS_FILE_PATH)
+    # The file must contain a 'Symbol' column
+    try:
+        stock_options = get_symbol_options(STOCKS_FILE_PATH, os.path.getmtime(STOCKS_FILE_PATH))
+    except ValueError as e:
+        stock_options = None
+        st.error(str(e))
 
-    # Check if the 'Symbol' column exists
-    if 'Symbol' not in symbols_df.columns:
-        st.error("The file must contain a 'Symbol' column with stock tickers.")
-    else:
+    if stock_options is not None:
         # Let the user select stocks from the file
-        stock_options = symbols_df['Symbol'].tolist()
-        selected_stocks = st.multiselect("Select Stock Symbols", stock_options, help="Choose one or more stocks to analyze")
+        selected_stocks = st.multiselect("Select Stock Symbols", stock_options, key='selected_stocks',
+                                         help="Choose one or more stocks to analyze")
+
+        # Fetch tuning
+        with st.sidebar:
+            st.header("Fetch Settings")
+            max_workers = st.slider("Parallel workers", 1, 32, DEFAULT_MAX_WORKERS,
+                                    help="Number of stocks fetched at the same time")
+            requests_per_second = st.slider("Max requests per second", 1.0, 20.0, DEFAULT_REQUESTS_PER_SECOND, step=0.5,
+                                            help="Upper bound on requests sent to Yahoo Finance")
+            batch_prices = st.checkbox("Batch price download", value=True,
+                                       help="Download price history for all selected stocks in a few multi-ticker requests")
+            chunk_size = st.number_input("Symbols per batch request", min_value=1, max_value=500, value=DEFAULT_CHUNK_SIZE,
+                                         disabled=not batch_prices)
+            force_refresh = st.checkbox("Force refresh (ignore cache)", value=False,
+                                        help="Re-download every dataset and overwrite the cached copy")
+            profile_run = st.checkbox("Profile fetches (cProfile)", value=False,
+                                      help="Save cProfile stats of the next fetch for download from Diagnostics")
+
+            snapshot_version = current_version()
+            snapshot = get_snapshot(snapshot_version) if snapshot_version else None
+            with st.expander("Snapshot"):
+                if snapshot is None:
+                    st.write("No snapshot yet. Run `python scheduler.py` to keep one warm; until then stocks are fetched live.")
+                else:
+                    metrics = snapshot_metrics(snapshot)
+                    st.write(f"Version {metrics['version']}, written {format_age(metrics['age_seconds'])} ago, "
+                             f"{metrics['tickers']} stocks ({metrics['failed']} failed last refresh)")
+                    for kind, age in metrics['refresh_age_seconds'].items():
+                        st.write(f"{kind.capitalize()}: refreshed {format_age(age)} ago in "
+                                 f"{metrics['refresh_seconds'][kind]:.1f}s")
+
+            disk_cache = get_disk_cache()
+            with st.expander("Cache Statistics"):
+                cache_stats = disk_cache.stats()
+                st.write(f"Hits: {cache_stats['hits']} | Misses: {cache_stats['misses']} | Incremental updates: {cache_stats['updates']} | Hit rate: {cache_stats['hit_rate']:.0%}")
+                st.write(f"Entries: {cache_stats['entries']} ({cache_stats['bytes'] / 1024 / 1024:.1f} MB)")
+                if cache_stats['datasets']:
+                    st.dataframe(pd.DataFrame(cache_stats['datasets']).T)
+                if st.button("Clear cache"):
+                    disk_cache.clear()
+
+        # Screen the whole universe by earnings date using calendar data only
+        with st.expander("Upcoming Results Screen"):
+            days_ahead = st.number_input("Reporting within (days)", min_value=1, max_value=90, value=14)
+            if st.button("Scan earnings calendar"):
+                scan_progress = st.progress(0)
+                st.session_state['calendar_index'] = build_calendar_index(
+                    stock_options, max_workers=max_workers, requests_per_second=requests_per_second,
+                    cache=disk_cache, force_refresh=force_refresh,
+                    on_complete=lambda done, total, ticker, result: scan_progress.progress(done / total))
+                scan_progress.empty()
+
+            # A scan made here wins over the scheduler's index, which may be a few days old
+            calendar_index = st.session_state.get('calendar_index')
+            if calendar_index is None and snapshot is not None:
+                calendar_index = snapshot['calendar_index']
+            if calendar_index is not None:
+                upcoming = calendar_index.upcoming(days_ahead)
+                st.write(f"{len(upcoming)} of {len(calendar_index)} stocks report within {days_ahead} days")
+                st.dataframe(upcoming, hide_index=True)
+                st.button("Select these stocks", disabled=upcoming.empty, on_click=st.session_state.update,
+                          kwargs={'selected_stocks': upcoming['Ticker'].tolist()})
+
+        # Check whether the Earnings Expectation labels predicted past post-earnings moves
+        with st.expander("Earnings Expectation Backtest"):
+            backtest_universe = selected_stocks or stock_options
+            st.write(f"Replays the labels before every past earnings date of the {len(backtest_universe)} "
+                     f"{'selected' if selected_stocks else 'listed'} stocks and scores them against "
+                     f"{'/'.join(map(str, FORWARD_HORIZONS))}-day returns after the report.")
+            if st.button("Run backtest"):
+                backtest_progress = st.progress(0)
+                # Replayed in-process: the app's server threads are a poor fit for forking workers
+                events, scores = run_backtest(
+                    backtest_universe, cache=disk_cache, max_workers=max_workers,
+                    requests_per_second=requests_per_second, force_refresh=force_refresh, processes=1,
+                    on_complete=lambda done, total, ticker, result: backtest_progress.progress(done / total))
+                backtest_progress.empty()
+                st.session_state['backtest'] = (events, scores)
+
+            if 'backtest' in st.session_state:
+                events, scores = st.session_state['backtest']
+                if scores.empty:
+                    st.warning("No earnings events with enough price history to backtest")
+                else:
+                    st.write(f"{events['ticker'].nunique()} stocks, {len(events)} replayed labels")
+                    st.dataframe(scores.round(2))
+
+        # Results of the last fetch live in the session, keyed by the selection, the
+        # data date and the snapshot, so reruns (paging, exporting, other widgets) need no network calls
+        analysis_key = (tuple(selected_stocks), datetime.now().date().isoformat(), snapshot_version)
+        analysis = st.session_state.get('analysis')
 
         # Button to start the data fetching process
-        if st.button('Fetch Financial Data') and selected_stocks:
-            all_results = []
+        fetch_clicked = st.button('Fetch Financial Data')
+        if fetch_clicked and selected_stocks and (force_refresh or analysis is None or analysis['key'] != analysis_key):
             progress_bar = st.progress(0)
             status_text = st.empty()
-            
-            for i, ticker in enumerate(selected_stocks):
-                status_text.text(f"Processing {ticker} ({i+1}/{len(selected_stocks)})...")
-                progress_bar.progress((i + 1) / len(selected_stocks))
-                
-                result = get_financial_data(ticker)
+
+            run_store = get_run_store()
+            run_id = run_store.start_run(source='app')
+
+            def update_progress(done, total, ticker, result):
+                status_text.text(f"Processed {ticker} ({done}/{total})...")
+                progress_bar.progress(done / total)
                 if result is not None:
-                    all_results.append(result)
-            
+                    run_store.append(run_id, result)
+
+            # Stocks in the snapshot are served from it; only the rest go to Yahoo
+            snapshot_results = {} if snapshot is None or force_refresh else \
+                {ticker: snapshot['results'][ticker] for ticker in selected_stocks if ticker in snapshot['results']}
+            live_stocks = [ticker for ticker in selected_stocks if ticker not in snapshot_results]
+            for done, (ticker, result) in enumerate(snapshot_results.items(), start=1):
+                update_progress(done, len(selected_stocks), ticker, result)
+
+            # The cache is shared across sessions, so its counters are read before and after the run
+            instrumentation = Instrumentation()
+            cache_stats_before = disk_cache.stats()
+            profile_path = os.path.join(os.path.dirname(CACHE_PATH), f"profile-run-{run_id}.prof") if profile_run else None
+            live_results = []
+            if live_stocks:
+                with profiled(profile_path) as profiler:
+                    live_results = run_analysis(
+                        live_stocks, max_workers=max_workers, requests_per_second=requests_per_second,
+                        cache=disk_cache, force_refresh=force_refresh, batch_prices=batch_prices,
+                        chunk_size=int(chunk_size), on_status=status_text.text, instrumentation=instrumentation,
+                        profiler=profiler, on_complete=lambda done, total, ticker, result: update_progress(
+                            len(snapshot_results) + done, len(selected_stocks), ticker, result))
+            results_by_ticker = dict(snapshot_results, **dict(zip(live_stocks, live_results)))
+            results = [results_by_ticker[ticker] for ticker in selected_stocks]
+
             progress_bar.empty()
             status_text.empty()
-            
-            if all_results:
+
+            analysis = st.session_state['analysis'] = {
+                'key': analysis_key,
+                'run_id': run_id,
+                'results': [result for result in results if result is not None],
+                'failed': [ticker for ticker, result in zip(selected_stocks, results) if result is None],
+                'diagnostics': instrumentation.summary(disk_cache.stats(since=cache_stats_before)),
+                'profile_path': profile_path,
+            }
+
+        if analysis is not None and analysis['key'] == analysis_key:
+            for ticker in analysis['failed']:
+                st.error(f"Error fetching financial data for {ticker}")
+
+            if analysis['results']:
                 st.success("Analysis complete!")
-                
-                # Display results for each stock
-                for result in all_results:
-                    st.markdown(f"## {result['Ticker']} Analysis")
-                    
-                    # Create columns for layout
-                    col1, col2 = st.columns([2, 3])
-                    
-                    with col1:
-                        # Key metrics
-                        st.markdown("### Key Metrics")
-                        
-                        # Price information
-                        st.markdown(f"""
-                            <div class="metric-card">
-                                <b>Latest Price:</b> {result['Latest Close Price']}<br>
-                                <b>1M Change:</b> <span class="{'positive' if '%' in result['1M Price Change'] and float(result['1M Price Change'].replace('%','')) > 0 else 'negative' if '%' in result['1M Price Change'] and float(result['1M Price Change'].replace('%','')) < 0 else ''}">{result['1M Price Change']}</span><br>
-                                <b>3M Change:</b> <span class="{'positive' if '%' in result['3M Price Change'] and float(result['3M Price Change'].replace('%','')) > 0 else 'negative' if '%' in result['3M Price Change'] and float(result['3M Price Change'].replace('%','')) < 0 else ''}">{result['3M Price Change']}</span><br>
-                                <b>1Y Change:</b> <span class="{'positive' if '%' in result['1Y Price Change'] and float(result['1Y Price Change'].replace('%','')) > 0 else 'negative' if '%' in result['1Y Price Change'] and float(result['1Y Price Change'].replace('%','')) < 0 else ''}">{result['1Y Price Change']}</span><br>
-                                <b>Price Trend:</b> <span class="{'positive' if 'Uptrend' in result['Price Trend'] else 'negative' if 'Downtrend' in result['Price Trend'] else 'neutral'}">{result['Price Trend']}</span>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Dividend information
-                        st.markdown("### Dividend Information")
-                        st.markdown(f"""
-                            <div class="metric-card">
-                                <b>Dividend Yield:</b> {result['Dividend Yield']}<br>
-                                <b>Next Dividend Date:</b> {result['Next Dividend Date']}<br>
-                                <b>Days Until Dividend:</b> {result['Days Until Dividend']}<br>
-                                <b>Predicted Amount:</b> {result['Predicted Dividend Amount']}<br>
-                                <b>Dividend Growth Rate:</b> {result['Dividend Growth Rate']}<br>
-                                <b>Past Dividends:</b> {', '.join(result['Past Dividends']) if result['Past Dividends'] else 'N/A'}
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Earnings information
-                        st.markdown("### Earnings Information")
-                        st.markdown(f"""
-                            <div class="metric-card">
-                                <b>Next Earnings Date:</b> {result['Next Earnings Date']}<br>
-                                <b>Days Until Earnings:</b> {result['Days Until Earnings']}<br>
-                                <b>Expectation:</b> <span class="{'positive' if 'Positive' in result['Earnings Expectation'] else 'negative' if 'Negative' in result['Earnings Expectation'] else 'neutral'}">{result['Earnings Expectation']}</span><br>
-                                <b>Confidence:</b> {result['Earnings Confidence']}
-                            </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        # Financial metrics
-                        st.markdown("### Financial Metrics")
-                        st.markdown(f"""
-                            <div class="metric-card">
-                                <b>EPS:</b> {result['EPS']}<br>
-                                <b>Net Income:</b> {result['Net Income']}<br>
-                                <b>Operating Income:</b> {result['Operating Income']}<br>
-                                <b>Revenue Growth:</b> {result['Revenue Growth']}<br>
-                                <b>Free Cash Flow:</b> {result['Free Cash Flow']}<br>
-                                <b>Cash Reserves:</b> {result['Cash Reserves']}<br>
-                                <b>Retained Earnings:</b> {result['Retained Earnings']}<br>
-                                <b>Working Capital:</b> {result['Working Capital']}<br>
-                                <b>Debt-to-Equity:</b> {result['Debt-to-Equity Ratio']}
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Price chart
-                        st.markdown("### Price Performance")
-                        fig = plot_stock_performance(result['Ticker'], result['Historical Data'])
-                        if fig:
-                            st.pyplot(fig)
-                        else:
-                            st.warning("No historical price data available for chart")
-                    
-                    st.markdown("---")
-                
-                # Button to save the results to Excel
-                if st.button('Save Results to Excel'):
-                    save_to_excel(all_results)
+
+                render_started = time.perf_counter()
+                render_results(analysis['results'])
+                render_seconds = time.perf_counter() - render_started
+
+                # Exported from the run store, so saving costs no network calls; the workbook
+                # is built once per run on request, not on every rerun
+                col1, col2 = st.columns(2)
+                with col1:
+                    render_excel_download('results', analysis['run_id'],
+                                          lambda buffer: get_run_store().export_xlsx(buffer, run_id=analysis['run_id']),
+                                          "Save Results to Excel")
+                with col2:
+                    if st.button("Clear results", help="Forget these results; the next fetch downloads fresh data"):
+                        del st.session_state['analysis']
+                        st.rerun()
+
+                render_diagnostics(analysis['diagnostics'], render_seconds, analysis['profile_path'])
             else:
                 st.warning("No results to display")
 
 else:
     st.error(f"{STOCKS_FILE_PATH} not found. Please ensure the file exists.")
 
+# Stored runs, queryable by run and ticker, exported to Excel on demand. Expanders run
+# their body on every rerun, so only recent runs are listed and the latest one is shown.
+with st.expander("Run History"):
+    run_store = get_run_store()
+    runs_df = run_store.runs(limit=RUN_HISTORY_LIMIT)
+    if runs_df.empty:
+        st.write("No saved runs yet.")
+    else:
+        st.dataframe(runs_df, hide_index=True)
+        run_choice = st.selectbox("Run", runs_df['run_id'].tolist() + ["All runs"])
+        ticker_filter = st.text_input("Tickers (comma separated, blank for all)")
+        filters = {
+            'run_id': None if run_choice == "All runs" else run_choice,
+            'ticker': [t.strip() for t in ticker_filter.split(',') if t.strip()] or None,
+        }
+        st.dataframe(run_store.query(**filters), hide_index=True)
+
+        # The latest run id marks whether "All runs" has grown since the file was built
+        render_excel_download('history', (filters['run_id'], tuple(filters['ticker'] or ()), runs_df['run_id'].iloc[0]),
+                              lambda buffer: run_store.export_xlsx(buffer, **filters), "Export to Excel")
+
 # Footer
 st.markdown("""
     <div style="text-align: center; margin-top: 50px;">
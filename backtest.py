@@ -0,0 +1,310 @@
+"""Backtest of the Price Trend / Earnings Expectation labels against post-earnings returns.
+
+For every past earnings date of every ticker, the labels are replayed as the app
+would have shown them LABEL_LEADS days before the report, using only closes up to
+that day. They are then scored against the realized 1/5/20-trading-day returns
+measured from the last close before the report. Yahoo does not say whether a
+report came before the open or after the close, so the 1-day return may miss an
+after-close reaction that the 5 and 20-day returns still include.
+
+Everything is computed from one multi-year history and one earnings-dates
+table per ticker, both served through the disk cache. Window lookups are
+vectorized with searchsorted, and large universes are split across processes.
+
+Example:
+    python backtest.py stocks.xlsx --output backtest.xlsx
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from analysis import STOCKS_FILE_PATH, classify_earnings_expectation, load_symbol_index
+from cache import CACHE_PATH, CachedTicker, DiskCache
+from diagnostics import Instrumentation, InstrumentedTicker
+from metrics import PRICE_WINDOW_OFFSETS, classify_price_trends
+from pipeline import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, HostRateLimiter, fetch_all
+from resilience import DEFAULT_RETRY_POLICY, CircuitBreaker, ResilientTicker
+
+logger = logging.getLogger(__name__)
+
+# Calendar days before each report at which the labels are replayed; one per
+# days-until-earnings bucket of classify_earnings_expectation (<=7, <=14, later)
+LABEL_LEADS = (3, 10, 21)
+
+# Trading days after the report over which realized returns are scored
+FORWARD_HORIZONS = (1, 5, 20)
+
+# History and earnings dates fetched per ticker
+BACKTEST_HISTORY_PERIOD = '5y'
+EARNINGS_DATES_LIMIT = 28
+
+# Tickers replayed per task; universes no larger than this stay in-process
+BACKTEST_CHUNK_SIZE = 250
+
+
+def _day_numbers(dates, tz=None):
+    # Exchange-local calendar days as int64 day numbers, for searchsorted
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_convert(tz) if tz is not None else dates
+        dates = dates.tz_localize(None)
+    return dates.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+
+
+def _shift_months(days, months):
+    # Day numbers `months` calendar months earlier, clamped to month end like pd.DateOffset(months=...)
+    dates = days.astype('datetime64[D]')
+    month = dates.astype('datetime64[M]')
+    day_of_month = (dates - month.astype('datetime64[D]')).astype(np.int64)
+    target = month - months
+    month_length = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+    return (target.astype('datetime64[D]') + np.minimum(day_of_month, month_length - 1)).astype(np.int64)
+
+
+def prepare_series(closes, earnings_dates):
+    """Turn a close series and earnings-date index into the compact arrays replay_ticker uses.
+
+    Returns (bar days, closes, report days) or None if either input is empty.
+    """
+    if closes is None or earnings_dates is None or len(closes) == 0 or len(earnings_dates) == 0:
+        return None
+    closes = closes.dropna()
+    days = _day_numbers(closes.index)
+    tz = getattr(closes.index, 'tz', None)
+    reports = np.unique(_day_numbers(earnings_dates, tz))
+    # Only reports with at least one bar before them can be scored
+    reports = reports[(reports > days[0]) & (reports <= days[-1])]
+    return days, closes.to_numpy(dtype=float), reports
+
+
+def replay_ticker(days, closes, reports, leads=LABEL_LEADS, horizons=FORWARD_HORIZONS):
+    """Replay every (report, lead) pair of one ticker at once.
+
+    Returns a dict of equal-length arrays: report and as-of days, lead, 1M/3M
+    percent changes as of the lead day (NaN without a full window of history)
+    and forward returns in percent per horizon (NaN past the end of history).
+    """
+    report_days = np.repeat(reports, len(leads))
+    lead_days = np.tile(np.asarray(leads, dtype=np.int64), len(reports))
+    as_of_days = report_days - lead_days
+
+    # Latest close on or before the as-of day, as when the app runs after that day's close
+    latest = np.searchsorted(days, as_of_days, side='right') - 1
+    valid = latest >= 0
+    latest_close = np.where(valid, closes[np.clip(latest, 0, None)], np.nan)
+
+    changes = {}
+    for name, offset in PRICE_WINDOW_OFFSETS.items():
+        # First close on or after the window start, as compute_price_windows does
+        starts = _shift_months(as_of_days, offset.kwds.get('months', 0) + 12 * offset.kwds.get('years', 0))
+        anchor = np.searchsorted(days, starts, side='left')
+        complete = valid & (starts >= days[0]) & (anchor <= latest)
+        anchor_close = closes[np.clip(anchor, 0, len(closes) - 1)]
+        changes[name] = np.where(complete & (anchor_close != 0),
+                                 (latest_close - anchor_close) / np.where(anchor_close != 0, anchor_close, 1) * 100,
+                                 np.nan)
+
+    # Forward returns from the last close before the report
+    base = np.searchsorted(days, report_days, side='left') - 1
+    forward = {}
+    for horizon in horizons:
+        end = base + horizon
+        inside = (base >= 0) & (end < len(closes))
+        forward[horizon] = np.where(inside, closes[np.clip(end, 0, len(closes) - 1)] / closes[np.clip(base, 0, None)]
+                                    * 100 - 100, np.nan)
+
+    return {
+        'report_day': report_days,
+        'as_of_day': as_of_days,
+        'lead': lead_days,
+        'change_1m': changes['1M'],
+        'change_3m': changes['3M'],
+        **{f'return_{horizon}d': forward[horizon] for horizon in horizons},
+    }
+
+
+def _replay_chunk(items, leads, horizons):
+    # Replays a list of (ticker, prepared series) and labels all their events together
+    tickers, replays = [], []
+    for ticker, (days, closes, reports) in items:
+        if len(reports):
+            replays.append(replay_ticker(days, closes, reports, leads, horizons))
+            tickers.append(ticker)
+    if not replays:
+        return None
+    events = pd.DataFrame({column: np.concatenate([replay[column] for replay in replays]) for column in replays[0]})
+    events.insert(0, 'ticker', np.repeat(tickers, [len(replay['lead']) for replay in replays]))
+    return label_events(events)
+
+
+def label_events(events):
+    """Add price_trend, earnings_expectation and earnings_confidence columns to replayed events."""
+    events['price_trend'] = classify_price_trends(events['change_1m'], events['change_3m'])
+    # The expectation depends only on (trend, lead), so classify each distinct pair once
+    pairs = events[['price_trend', 'lead']].drop_duplicates()
+    labels = pd.DataFrame([classify_earnings_expectation(trend, lead) for trend, lead in pairs.itertuples(index=False)],
+                          columns=['earnings_expectation', 'earnings_confidence'], index=pairs.index)
+    events = events.merge(pd.concat([pairs, labels], axis=1), on=['price_trend', 'lead'], how='left')
+    # A trend needs a full 3-month window; events without one are kept but not labelled
+    unlabelled = events['price_trend'] == "N/A"
+    events.loc[unlabelled, ['earnings_expectation', 'earnings_confidence']] = "N/A"
+    return events
+
+
+def replay_events(series, leads=LABEL_LEADS, horizons=FORWARD_HORIZONS, processes=None,
+                  chunk_size=BACKTEST_CHUNK_SIZE):
+    """Replay and label every event in `series` ({ticker: prepare_series output}).
+
+    Universes larger than `chunk_size` tickers are split across a process pool of
+    `processes` workers (os.cpu_count() if None); processes=1 keeps it in-process.
+    Returns one row per (ticker, report, lead) with dates as Timestamps.
+    """
+    items = [(ticker, prepared) for ticker, prepared in series.items() if prepared is not None]
+    if processes == 1 or len(items) <= chunk_size:
+        frames = [_replay_chunk(items, leads, horizons)]
+    else:
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            frames = list(pool.map(_replay_chunk, chunks, repeat(leads), repeat(horizons)))
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return pd.DataFrame()
+    events = pd.concat(frames, ignore_index=True)
+    for column in ('report_day', 'as_of_day'):
+        events[column.replace('_day', '_date')] = pd.to_datetime(events.pop(column).to_numpy().astype('datetime64[D]'))
+    return events
+
+
+def expectation_direction(expectation):
+    """+1 for a positive label, -1 for a negative one, 0 otherwise."""
+    if "Positive" in expectation:
+        return 1
+    if "Negative" in expectation:
+        return -1
+    return 0
+
+
+def score_events(events, horizons=FORWARD_HORIZONS):
+    """Score each (expectation, confidence) label against realized forward returns.
+
+    Per label and horizon: number of events, mean and median return, excess mean
+    return over all labelled events, and hit rate, i.e. the share of returns with
+    the label's sign (NaN for neutral labels).
+    """
+    labelled = events[events['earnings_expectation'] != "N/A"]
+    direction = labelled['earnings_expectation'].map(expectation_direction)
+    groups = labelled.groupby(['earnings_expectation', 'earnings_confidence'], sort=False)
+    scores = pd.DataFrame({'events': groups.size()})
+    for horizon in horizons:
+        returns = labelled[f'return_{horizon}d']
+        scored = returns.notna()
+        hits = (np.sign(returns) == direction).astype(float).where(scored & (direction != 0))
+        scores[f'mean_{horizon}d'] = groups[returns.name].mean()
+        scores[f'median_{horizon}d'] = groups[returns.name].median()
+        scores[f'excess_{horizon}d'] = scores[f'mean_{horizon}d'] - returns.mean()
+        scores[f'hit_rate_{horizon}d'] = hits.groupby([labelled['earnings_expectation'],
+                                                       labelled['earnings_confidence']], sort=False).mean()
+    return scores.sort_values('events', ascending=False)
+
+
+def fetch_backtest_series(tickers, cache=None, max_workers=DEFAULT_MAX_WORKERS,
+                          requests_per_second=DEFAULT_REQUESTS_PER_SECOND, force_refresh=False, on_complete=None,
+                          instrumentation=None, retry_policy=DEFAULT_RETRY_POLICY):
+    """Fetch a multi-year history and the earnings dates of every ticker and prepare them for replay.
+
+    Returns {ticker: prepare_series output}; tickers without data map to None.
+    """
+    import yfinance as yf
+
+    limiter = HostRateLimiter(requests_per_second)
+    breaker = CircuitBreaker()
+    instrumentation = instrumentation or Instrumentation()
+
+    def fetch_series(ticker):
+        stock = ResilientTicker(InstrumentedTicker(yf.Ticker(ticker), instrumentation), limiter, breaker,
+                                retry_policy, instrumentation)
+        if cache is not None:
+            stock = CachedTicker(stock, cache, force_refresh=force_refresh)
+        try:
+            history = stock.history(period=BACKTEST_HISTORY_PERIOD)
+            earnings_dates = stock.get_earnings_dates(limit=EARNINGS_DATES_LIMIT)
+        except Exception as e:
+            logger.warning("Could not fetch backtest data for %s: %s", ticker, e)
+            return None
+        closes = history['Close'] if history is not None and not history.empty else None
+        return prepare_series(closes, earnings_dates.index if earnings_dates is not None else None)
+
+    tickers = list(tickers)
+    return dict(zip(tickers, fetch_all(tickers, fetch_series, max_workers=max_workers, on_complete=on_complete)))
+
+
+def run_backtest(tickers, cache=None, max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                 force_refresh=False, leads=LABEL_LEADS, horizons=FORWARD_HORIZONS, processes=None, on_complete=None):
+    """Fetch, replay and score `tickers`. Returns (events, scores)."""
+    series = fetch_backtest_series(tickers, cache=cache, max_workers=max_workers,
+                                   requests_per_second=requests_per_second, force_refresh=force_refresh,
+                                   on_complete=on_complete)
+    events = replay_events(series, leads, horizons, processes=processes)
+    if events.empty:
+        return events, pd.DataFrame()
+    return events, score_events(events, horizons)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the Earnings Expectation labels against post-earnings returns")
+    parser.add_argument('symbols', nargs='?', default=STOCKS_FILE_PATH,
+                        help="Symbol file: .xlsx/.csv with a 'Symbol' column, or text with one symbol per line")
+    parser.add_argument('-o', '--output', help="Write the scores and every replayed event to this Excel file")
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of stocks fetched at the same time")
+    parser.add_argument('--requests-per-second', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Upper bound on requests sent to Yahoo Finance")
+    parser.add_argument('--processes', type=int, help="Replay processes (default: one per CPU, 1 to stay in-process)")
+    parser.add_argument('--leads', type=int, nargs='+', default=list(LABEL_LEADS), metavar='DAYS',
+                        help="Days before each report at which the labels are replayed")
+    parser.add_argument('--horizons', type=int, nargs='+', default=list(FORWARD_HORIZONS), metavar='DAYS',
+                        help="Trading days after each report over which returns are scored")
+    parser.add_argument('--cache', default=CACHE_PATH, help="On-disk cache location")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the on-disk cache")
+    parser.add_argument('--force-refresh', action='store_true', help="Re-download every dataset")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        tickers = load_symbol_index(args.symbols)
+    except (OSError, ValueError) as e:
+        print(f"Could not read symbols from {args.symbols}: {e}", file=sys.stderr)
+        return 2
+
+    cache = None if args.no_cache else DiskCache(args.cache)
+    events, scores = run_backtest(
+        tickers, cache=cache, max_workers=args.workers, requests_per_second=args.requests_per_second,
+        force_refresh=args.force_refresh, leads=tuple(args.leads), horizons=tuple(args.horizons),
+        processes=args.processes,
+        on_complete=lambda done, total, ticker, result: print(f"[{done}/{total}] {ticker}", file=sys.stderr,
+                                                               flush=True))
+    if events.empty:
+        print("No earnings events with price history to backtest", file=sys.stderr)
+        return 1
+
+    print(f"{events['ticker'].nunique()} tickers, {events['report_date'].count()} replayed labels")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(scores.round(2).to_string())
+    if args.output:
+        with pd.ExcelWriter(args.output) as writer:
+            scores.reset_index().to_excel(writer, sheet_name='Scores', index=False)
+            events.to_excel(writer, sheet_name='Events', index=False)
+        print(f"Backtest written to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
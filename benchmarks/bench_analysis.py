@@ -0,0 +1,106 @@
+"""Analysis benchmarks: one ticker, batches of 10/100/1000, worker scaling and per-ticker vs vectorized metrics."""
+import time
+from datetime import datetime
+
+import pytest
+
+from analysis import classify_price_trend, compute_price_windows, get_financial_data, run_analysis
+from benchmark_data import BATCH_SIZES, symbols
+from metrics import build_close_panel, build_dividend_table, compute_universe_metrics
+from replay import ReplayUniverse
+from resilience import RetryPolicy
+
+
+def test_single_ticker(benchmark, universe):
+    ticker = symbols(1)[0]
+    result = benchmark(lambda: get_financial_data(ticker, stock=universe.ticker(ticker)))
+    assert result.ticker == ticker
+
+
+@pytest.mark.parametrize('count', BATCH_SIZES)
+def test_batch(benchmark, universe, count):
+    tickers = symbols(count)
+    results = benchmark.pedantic(run_analysis, args=(tickers,), kwargs={'requests_per_second': 0},
+                                 rounds=1 if count >= 1000 else 3)
+    assert [result.ticker for result in results] == tickers
+
+
+def _timed_latency_batch(ticker_data, max_workers):
+    # 20 ms per request makes the batch I/O-bound, like the real pipeline
+    tickers = symbols(24)
+    with ReplayUniverse(ticker_data, latency=0.02).install():
+        started = time.perf_counter()
+        results = run_analysis(tickers, max_workers=max_workers, requests_per_second=0)
+        return results, time.perf_counter() - started
+
+
+@pytest.fixture(scope='module')
+def serial_latency_seconds(ticker_data):
+    return _timed_latency_batch(ticker_data, 1)[1]
+
+
+@pytest.mark.parametrize('max_workers', (1, 2, 4, 8))
+def test_batch_with_latency(benchmark, ticker_data, serial_latency_seconds, max_workers):
+    results, seconds = benchmark.pedantic(_timed_latency_batch, args=(ticker_data, max_workers), rounds=1)
+    assert all(result is not None for result in results)
+    # Workers overlap request latency, so wall time should fall close to 1/max_workers;
+    # half of linear leaves room for the CPU-bound share of each ticker
+    assert serial_latency_seconds / seconds >= 0.5 * max_workers
+
+
+def test_batch_flaky_upstream(benchmark, ticker_data):
+    # One request in five is throttled; retries keep every ticker complete
+    tickers = symbols(50)
+    with ReplayUniverse(ticker_data, failure_rate=0.2, seed=1).install():
+        results = benchmark.pedantic(run_analysis, args=(tickers,), rounds=1, kwargs={
+            'requests_per_second': 0, 'batch_prices': False,
+            'retry_policy': RetryPolicy(max_attempts=8, base_delay=0.001)})
+    assert all(result is not None and not result.missing_datasets for result in results)
+
+
+# Universe size of the paired per-ticker vs vectorized metrics benchmark
+PANEL_SIZE = 5000
+
+
+@pytest.fixture(scope='module')
+def panel_data(ticker_data):
+    # The session's tickers cycled under new names fill the larger universe
+    datasets = list(ticker_data.values())
+    return {ticker: datasets[i % len(datasets)] for i, ticker in enumerate(symbols(PANEL_SIZE))}
+
+
+def _per_ticker_metrics(panel_data):
+    # The price and dividend steps of get_financial_data, one ticker at a time, without
+    # the statement and calendar parsing the vectorized engine does not do either
+    today = datetime.now().date()
+    metrics = []
+    for data in panel_data.values():
+        latest, close_1m, close_3m, close_1y = compute_price_windows(data['history'])
+        change_1m = (latest - close_1m) / close_1m * 100
+        change_3m = (latest - close_3m) / close_3m * 100
+        row = {'latest_close': latest, 'change_1m': change_1m, 'change_3m': change_3m,
+               'change_1y': (latest - close_1y) / close_1y * 100,
+               'price_trend': classify_price_trend(change_1m, change_3m)}
+
+        dividends = data['dividends']
+        row['dividend_growth'] = dividends.pct_change().mean() * 100
+        row['predicted_dividend'] = float(dividends.iloc[-1])
+        row['dividend_percentage'] = row['predicted_dividend'] / float(latest) * 100
+        past_dividends = dividends.tail(4)
+        next_dividend_date = (past_dividends.index[-1] + past_dividends.index.to_series().diff().dropna().mean()).date()
+        row['next_dividend_date'] = next_dividend_date
+        row['days_until_dividend'] = float((next_dividend_date - today).days)
+        metrics.append(row)
+    return metrics
+
+
+def _vectorized_metrics(panel_data):
+    close_panel = build_close_panel({ticker: data['history'] for ticker, data in panel_data.items()})
+    dividends = build_dividend_table({ticker: data['dividends'] for ticker, data in panel_data.items()})
+    return compute_universe_metrics(close_panel, dividends)
+
+
+@pytest.mark.parametrize('engine', (_per_ticker_metrics, _vectorized_metrics), ids=('per_ticker', 'vectorized'))
+def test_universe_metrics(benchmark, panel_data, engine):
+    metrics = benchmark.pedantic(engine, args=(panel_data,), rounds=1 if engine is _per_ticker_metrics else 3)
+    assert len(metrics) == PANEL_SIZE
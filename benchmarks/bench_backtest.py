@@ -0,0 +1,24 @@
+"""Backtest benchmarks: replaying and scoring labels for a 1000-ticker, 5-year universe."""
+import pytest
+
+from backtest import prepare_series, replay_events, score_events
+from replay import synthetic_ticker_data
+
+
+@pytest.fixture(scope='module')
+def series():
+    # 100 distinct 5-year series under 10 names each keep fixture generation quick
+    base = [synthetic_ticker_data(f"BT{i:03d}.NS", days=1300) for i in range(100)]
+    return {f"BT{i:04d}.NS": prepare_series(base[i % 100]['history']['Close'], base[i % 100]['earnings_dates'].index)
+            for i in range(1000)}
+
+
+def test_replay_events(benchmark, series):
+    events = benchmark.pedantic(replay_events, args=(series,), kwargs={'processes': 1}, rounds=3)
+    assert events['ticker'].nunique() == len(series)
+
+
+def test_score_events(benchmark, series):
+    events = replay_events(series, processes=1)
+    scores = benchmark(score_events, events)
+    assert scores['events'].sum() == (events['earnings_expectation'] != "N/A").sum()
@@ -0,0 +1,59 @@
+"""Output benchmarks: Excel export from the run store and chart generation."""
+import io
+
+import pytest
+
+from analysis import run_analysis
+from charts import downsample_closes, plot_stock_performance
+from benchmark_data import symbols
+from store import RunStore
+
+
+@pytest.fixture(scope='module')
+def results(ticker_data):
+    from replay import ReplayUniverse
+
+    with ReplayUniverse(ticker_data).install():
+        return run_analysis(symbols(100), requests_per_second=0)
+
+
+@pytest.fixture
+def run_store(tmp_path, results):
+    store = RunStore(str(tmp_path / 'runs.sqlite'))
+    run_id = store.start_run('benchmark')
+    for result in results:
+        store.append(run_id, result)
+    return store
+
+
+def test_excel_export(benchmark, run_store, results):
+    rows = benchmark(lambda: run_store.export_xlsx(io.BytesIO()))
+    assert rows == len(results)
+
+
+def test_chart_figure(benchmark, results):
+    result = results[0]
+
+    def draw():
+        fig = plot_stock_performance(result.ticker, result.historical_data)
+        fig.savefig(io.BytesIO(), format='png')
+        return fig
+
+    assert benchmark(draw) is not None
+
+
+def test_chart_figure_reused(benchmark, results):
+    result = results[0]
+    fig = plot_stock_performance(result.ticker, result.historical_data)
+
+    def redraw():
+        plot_stock_performance(result.ticker, result.historical_data, fig=fig)
+        fig.savefig(io.BytesIO(), format='png')
+        return fig
+
+    assert benchmark(redraw) is fig
+
+
+def test_downsample_closes(benchmark, results):
+    closes = benchmark(downsample_closes, results[0].historical_data)
+    assert closes.index[-1] == results[0].historical_data.index[-1]
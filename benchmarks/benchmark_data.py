@@ -0,0 +1,7 @@
+"""Universe sizes and symbol names shared by the benchmark modules and their fixtures."""
+
+BATCH_SIZES = (10, 100, 1000)
+
+
+def symbols(count):
+    return [f"SYM{i:04d}.NS" for i in range(count)]
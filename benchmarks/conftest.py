@@ -0,0 +1,35 @@
+"""Shared fixtures for the offline benchmark suite.
+
+Every benchmark runs against replay.ReplayUniverse, so no network is needed.
+Set REPLAY_FIXTURES to a directory written by `python replay.py record` to
+benchmark against recorded responses instead of synthetic ones.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_data import BATCH_SIZES, symbols  # noqa: E402
+from replay import ReplayUniverse, load_recordings, synthetic_ticker_data  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def ticker_data():
+    """{ticker: datasets} for the largest batch, recorded if available, else synthetic."""
+    directory = os.environ.get('REPLAY_FIXTURES')
+    if directory:
+        recordings = load_recordings(directory)
+        if recordings:
+            # Cycle the recordings under synthetic names to fill the largest batch
+            recorded = list(recordings.values())
+            return {ticker: recorded[i % len(recorded)] for i, ticker in enumerate(symbols(max(BATCH_SIZES)))}
+    return {ticker: synthetic_ticker_data(ticker) for ticker in symbols(max(BATCH_SIZES))}
+
+
+@pytest.fixture
+def universe(ticker_data):
+    """A zero-latency universe patched into yfinance for the duration of the test."""
+    with ReplayUniverse(ticker_data).install() as universe:
+        yield universe
@@ -0,0 +1,301 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+# Default location of the on-disk cache
+CACHE_PATH = os.path.join('.cache', 'yfinance.sqlite')
+
+# Upper bound on the total size of cached payloads before LRU eviction kicks in
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# How long each yfinance dataset stays fresh. Annual statements change a few
+# times a year, prices and corporate calendars at most daily.
+DATASET_TTLS = {
+    'financials': timedelta(days=7),
+    'balance_sheet': timedelta(days=7),
+    'cashflow': timedelta(days=7),
+    'dividends': timedelta(days=1),
+    'info': timedelta(days=1),
+    'calendar': timedelta(hours=12),
+    'history': timedelta(hours=12),
+    'earnings_dates': timedelta(days=1),
+}
+
+# Rolling history periods that are kept up to date incrementally rather than re-downloaded
+HISTORY_PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+}
+
+# Relative difference between a stored and a re-downloaded close that signals re-adjusted history
+ADJUSTMENT_TOLERANCE = 1e-6
+
+# yf.Ticker properties served through the cache (history and earnings dates come from methods, handled separately)
+CACHED_ATTRIBUTES = tuple(name for name in DATASET_TTLS if name not in ('history', 'earnings_dates'))
+
+
+class DiskCache:
+    """SQLite-backed cache of yfinance payloads keyed by ticker and dataset.
+
+    Entries expire after their dataset's TTL and the least recently used ones are
+    evicted once the stored payloads exceed `max_bytes`. Safe to share between threads.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DATASET_TTLS, **(ttls or {}))
+        self._lock = threading.Lock()
+        self._counters = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                ticker TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (ticker, dataset)
+            )
+        """)
+        self._conn.commit()
+
+    def _ttl(self, dataset):
+        # Variants such as "history:period=1y" share the TTL of their base dataset
+        return self.ttls.get(dataset.split(':', 1)[0], timedelta(0)).total_seconds()
+
+    def _count(self, dataset, outcome):
+        counters = self._counters.setdefault(dataset.split(':', 1)[0], {'hits': 0, 'misses': 0, 'updates': 0})
+        counters[outcome] += 1
+
+    def get(self, ticker, dataset):
+        """Return (found, value) for a fresh entry, updating its LRU position."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, fetched_at FROM entries WHERE ticker = ? AND dataset = ?",
+                (ticker, dataset),
+            ).fetchone()
+            if row is None or now - row[1] > self._ttl(dataset):
+                self._count(dataset, 'misses')
+                return False, None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE ticker = ? AND dataset = ?",
+                (now, ticker, dataset),
+            )
+            self._conn.commit()
+            self._count(dataset, 'hits')
+        return True, pickle.loads(row[0])
+
+    def entry_state(self, ticker, dataset):
+        """'missing', 'fresh' or 'expired', without loading the payload or counting a hit or miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM entries WHERE ticker = ? AND dataset = ?",
+                (ticker, dataset),
+            ).fetchone()
+        if row is None:
+            return 'missing'
+        return 'fresh' if time.time() - row[0] <= self._ttl(dataset) else 'expired'
+
+    def peek(self, ticker, dataset):
+        """Return the stored value even if it has expired, or None. Not counted in stats."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM entries WHERE ticker = ? AND dataset = ?",
+                (ticker, dataset),
+            ).fetchone()
+        return pickle.loads(row[0]) if row is not None else None
+
+    def put(self, ticker, dataset, value):
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (ticker, dataset, payload, len(payload), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT ticker, dataset, size FROM entries ORDER BY last_access"
+        ).fetchall()
+        for ticker, dataset, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE ticker = ? AND dataset = ?", (ticker, dataset))
+            total -= size
+
+    def record_update(self, dataset):
+        """Count an expired entry that was refreshed incrementally instead of re-downloaded."""
+        with self._lock:
+            self._count(dataset, 'updates')
+
+    def get_or_fetch(self, ticker, dataset, fetch, force_refresh=False):
+        """Return the cached value, or call `fetch()` and store its result."""
+        if not force_refresh:
+            found, value = self.get(ticker, dataset)
+            if found:
+                return value
+        else:
+            with self._lock:
+                self._count(dataset, 'misses')
+        value = fetch()
+        self.put(ticker, dataset, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self, since=None):
+        """Return hit/miss counters per dataset plus totals and the current cache size.
+
+        The counters cover the cache's lifetime, or only what happened after `since`,
+        an earlier stats() result, e.g. to report one run against a shared cache.
+        """
+        with self._lock:
+            datasets = {name: dict(counts) for name, counts in self._counters.items()}
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if since is not None:
+            datasets = {name: {outcome: count - since['datasets'].get(name, {}).get(outcome, 0)
+                               for outcome, count in counts.items()} for name, counts in datasets.items()}
+            datasets = {name: counts for name, counts in datasets.items() if any(counts.values())}
+        hits = sum(counts['hits'] for counts in datasets.values())
+        misses = sum(counts['misses'] for counts in datasets.values())
+        return {
+            'hits': hits,
+            'misses': misses,
+            'updates': sum(counts['updates'] for counts in datasets.values()),
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'entries': entries,
+            'bytes': size,
+            'datasets': datasets,
+        }
+
+
+def history_dataset(**kwargs):
+    """Return the cache dataset name for a ``history(**kwargs)`` call."""
+    return 'history:' + ','.join(f"{key}={kwargs[key]}" for key in sorted(kwargs))
+
+
+class CachedTicker:
+    """Wraps a yf.Ticker so dataset reads go through a DiskCache."""
+
+    def __init__(self, ticker, cache, force_refresh=False):
+        self._ticker = ticker
+        self._cache = cache
+        self._force_refresh = force_refresh
+        self.ticker = ticker.ticker
+
+    def __getattr__(self, name):
+        if name in CACHED_ATTRIBUTES:
+            return self._cache.get_or_fetch(self.ticker, name, lambda: getattr(self._ticker, name), self._force_refresh)
+        return getattr(self._ticker, name)
+
+    def history(self, **kwargs):
+        dataset = history_dataset(**kwargs)
+        if set(kwargs) == {'period'} and kwargs['period'] in HISTORY_PERIOD_OFFSETS:
+            return self._rolling_history(dataset, kwargs['period'])
+        return self._cache.get_or_fetch(self.ticker, dataset, lambda: self._ticker.history(**kwargs), self._force_refresh)
+
+    def get_earnings_dates(self, limit=12):
+        return self._cache.get_or_fetch(self.ticker, f"earnings_dates:limit={limit}",
+                                        lambda: self._ticker.get_earnings_dates(limit=limit), self._force_refresh)
+
+    def _rolling_history(self, dataset, period):
+        """Serve a rolling-window history, downloading only the bars added since it was stored.
+
+        An expired series is refreshed with ``history(start=<last completed bar>)``. The last
+        stored bar may have been a partial intraday bar, so it is simply overwritten by the
+        re-downloaded one; the bar before it is complete and doubles as a consistency check.
+        The stored series is discarded and the full window downloaded again when
+          * the re-fetched close of that completed bar differs from the stored one, which
+            means Yahoo has re-adjusted the history since it was stored, or
+          * a bar from there on carries a dividend or stock split that was not stored yet,
+            since the adjusted closes of every earlier bar change with it.
+        """
+        if not self._force_refresh:
+            found, value = self._cache.get(self.ticker, dataset)
+            if found:
+                return value
+
+        stored = None if self._force_refresh else self._cache.peek(self.ticker, dataset)
+        if stored is not None and not stored.empty:
+            new_bars = self._ticker.history(start=history_refresh_start(stored).strftime('%Y-%m-%d'))
+            merged = merge_history(stored, new_bars, period)
+            if merged is not None:
+                self._cache.record_update(dataset)
+                self._cache.put(self.ticker, dataset, merged)
+                return merged
+
+        history = self._ticker.history(period=period)
+        self._cache.put(self.ticker, dataset, history)
+        return history
+
+
+def history_refresh_start(stored):
+    """Date a stored rolling history is re-downloaded from: its last completed bar.
+
+    The bar after it, the last one stored, may have been a partial intraday bar.
+    """
+    return stored.index[-2] if len(stored) > 1 else stored.index[-1]
+
+
+def merge_history(stored, new_bars, period):
+    """`stored` topped up with `new_bars` and trimmed to the rolling `period`.
+
+    `new_bars` are the bars from history_refresh_start(stored) on. Returns None when
+    they show the stored adjusted closes are stale and the window must be downloaded again.
+    """
+    if new_bars.empty:
+        return stored
+    if _history_invalidated(stored, new_bars, history_refresh_start(stored)):
+        return None
+    merged = pd.concat([stored[stored.index < new_bars.index[0]], new_bars])
+    merged = merged[~merged.index.duplicated(keep='last')]
+    cutoff = (pd.Timestamp.now(tz=merged.index.tz) - HISTORY_PERIOD_OFFSETS[period]).normalize()
+    return merged[merged.index >= cutoff]
+
+
+def _history_invalidated(stored, new_bars, check_date):
+    """Tell whether `new_bars` shows that the adjusted closes in `stored` are stale.
+
+    `check_date` is the last completed stored bar; bars after it may have been partial.
+    """
+    if check_date in new_bars.index and check_date < stored.index[-1]:
+        stored_close = stored.loc[check_date, 'Close']
+        new_close = new_bars.loc[check_date, 'Close']
+        if abs(new_close - stored_close) > ADJUSTMENT_TOLERANCE * abs(stored_close):
+            return True
+
+    added = new_bars[new_bars.index > check_date]
+    for column in ('Dividends', 'Stock Splits'):
+        if column in added.columns:
+            known = stored[column].reindex(added.index).fillna(0) if column in stored.columns else 0
+            if ((added[column] != 0) & (added[column] != known)).any():
+                return True
+    return False
@@ -0,0 +1,42 @@
+"""Price charts: downsampled series for interactive charts and a reusable static figure.
+
+matplotlib is imported only when a static chart is actually drawn.
+"""
+
+# Upper bound on points sent to an interactive chart; a year of daily bars is ~250
+MAX_CHART_POINTS = 120
+
+
+def downsample_closes(historical_data, max_points=MAX_CHART_POINTS):
+    """Closing prices thinned to at most `max_points`, always keeping the latest bar."""
+    if historical_data is None or historical_data.empty:
+        return None
+    closes = historical_data['Close']
+    if len(closes) <= max_points:
+        return closes
+    step = -(-len(closes) // max_points)
+    # Count back from the latest bar so the most recent close is always shown
+    return closes.iloc[::-1].iloc[::step].iloc[::-1]
+
+
+def plot_stock_performance(ticker, historical_data, fig=None):
+    """Draw a 1-year closing price chart into `fig` (a new Figure if None) and return it.
+
+    Figures are created without pyplot, so nothing is kept in a global figure
+    registry; pass the same figure back in to redraw without allocating a new one.
+    """
+    if historical_data is None or historical_data.empty:
+        return None
+    if fig is None:
+        from matplotlib.figure import Figure
+        fig = Figure(figsize=(10, 5))
+    fig.clear()
+
+    ax = fig.add_subplot()
+    ax.plot(historical_data.index, historical_data['Close'], label='Closing Price')
+    ax.set_title(f'{ticker} 1-Year Performance')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price ($)')
+    ax.grid(True)
+    ax.legend()
+    return fig
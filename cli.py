@@ -0,0 +1,123 @@
+"""Headless batch runner: analyse every symbol in a file without starting Streamlit.
+
+Example:
+    python cli.py stocks.xlsx --workers 8 --output dividend_predictions.xlsx
+"""
+import argparse
+import os
+import sys
+
+from analysis import STOCKS_FILE_PATH, load_symbol_index, run_analysis
+from cache import CACHE_PATH, DiskCache
+from charts import plot_stock_performance
+from diagnostics import Instrumentation, profiled
+from earnings import build_calendar_index
+from pipeline import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND
+from store import RUN_STORE_PATH, RunStore
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stock dividend prediction and financial analysis batch runner")
+    parser.add_argument('symbols', nargs='?', default=STOCKS_FILE_PATH,
+                        help="Symbol file: .xlsx/.csv with a 'Symbol' column, or text with one symbol per line")
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of stocks fetched at the same time")
+    parser.add_argument('-o', '--output', help="Also export this run's results to an Excel file")
+    parser.add_argument('--store', default=RUN_STORE_PATH, help="Run store every result is appended to")
+    parser.add_argument('--requests-per-second', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Upper bound on requests sent to Yahoo Finance")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Symbols per batch price request")
+    parser.add_argument('--no-batch-prices', action='store_true', help="Fetch price history per ticker")
+    parser.add_argument('--charts', metavar='DIR', help="Write a PNG price chart per ticker to this directory")
+    parser.add_argument('--reporting-within', type=int, metavar='DAYS',
+                        help="Only analyse tickers with earnings in the next DAYS days (screened from calendars alone)")
+    parser.add_argument('--metrics-out', metavar='PREFIX',
+                        help="Write run diagnostics to PREFIX.json (summary) and PREFIX.csv (per-stage timings)")
+    parser.add_argument('--profile', metavar='FILE', help="Profile the run with cProfile and save the stats to FILE")
+    parser.add_argument('--cache', default=CACHE_PATH, help="On-disk cache location")
+    parser.add_argument('--no-cache', action='store_true', help="Do not read or write the on-disk cache")
+    parser.add_argument('--force-refresh', action='store_true', help="Re-download every dataset")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        tickers = load_symbol_index(args.symbols)
+    except (OSError, ValueError) as e:
+        print(f"Could not read symbols from {args.symbols}: {e}", file=sys.stderr)
+        return 2
+
+    cache = None if args.no_cache else DiskCache(args.cache)
+    if args.reporting_within is not None:
+        calendar_index = build_calendar_index(tickers, max_workers=args.workers,
+                                              requests_per_second=args.requests_per_second,
+                                              cache=cache, force_refresh=args.force_refresh)
+        tickers = calendar_index.within(args.reporting_within)
+        print(f"{len(tickers)} of {len(calendar_index)} tickers report within {args.reporting_within} days",
+              file=sys.stderr)
+
+    run_store = RunStore(args.store)
+    run_id = run_store.start_run(source='cli')
+    if args.charts:
+        os.makedirs(args.charts, exist_ok=True)
+    chart_figure = None
+
+    def report(done, total, ticker, result):
+        nonlocal chart_figure
+        if result is not None:
+            run_store.append(run_id, result)
+            if args.charts and result.historical_data is not None:
+                # One figure is redrawn for every ticker, so memory stays flat over long runs
+                chart_figure = plot_stock_performance(ticker, result.historical_data, fig=chart_figure)
+                chart_figure.savefig(os.path.join(args.charts, f"{ticker}.png"))
+        status = result.price_trend if result is not None else "FAILED"
+        if result is not None and result.missing_datasets:
+            status += f" (missing: {', '.join(result.missing_datasets)})"
+        print(f"[{done}/{total}] {ticker}: {status}", flush=True)
+
+    instrumentation = Instrumentation()
+    with profiled(args.profile) as profiler:
+        results = run_analysis(
+            tickers,
+            max_workers=args.workers,
+            requests_per_second=args.requests_per_second,
+            cache=cache,
+            force_refresh=args.force_refresh,
+            batch_prices=not args.no_batch_prices,
+            chunk_size=args.chunk_size,
+            on_complete=report,
+            on_status=lambda message: print(message, file=sys.stderr, flush=True),
+            instrumentation=instrumentation,
+            profiler=profiler,
+        )
+
+    succeeded = [result for result in results if result is not None]
+    failed = [ticker for ticker, result in zip(tickers, results) if result is None]
+    partial = [result.ticker for result in succeeded if result.missing_datasets]
+    if args.metrics_out:
+        instrumentation.write_json(f"{args.metrics_out}.json", cache.stats() if cache is not None else None)
+        instrumentation.write_csv(f"{args.metrics_out}.csv")
+        print(f"Diagnostics written to {args.metrics_out}.json and {args.metrics_out}.csv")
+    if args.profile:
+        print(f"Profile saved to {args.profile}")
+
+    print(f"Results saved as run {run_id} in {args.store}")
+    if args.output and succeeded:
+        try:
+            run_store.export_xlsx(args.output, run_id=run_id)
+            print(f"Results exported to {args.output}")
+        except Exception as e:
+            print(f"Error exporting to Excel: {e}", file=sys.stderr)
+
+    print(f"\n{len(succeeded)} succeeded ({len(partial)} partial), {len(failed)} failed out of {len(tickers)} tickers")
+    if partial:
+        print("Partial: " + ", ".join(partial))
+    if failed:
+        print("Failed: " + ", ".join(failed))
+    return 0 if not failed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
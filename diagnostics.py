@@ -0,0 +1,180 @@
+"""Run instrumentation: per-stage and per-ticker timers, request/payload-size/retry counters and profiling.
+
+An Instrumentation object is threaded through run_analysis; InstrumentedTicker
+sits directly on top of yf.Ticker so it only sees requests that reach Yahoo
+(cache hits never get that far).
+"""
+import cProfile
+import json
+import pickle
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from pipeline import RATE_LIMITED_ATTRIBUTES, RATE_LIMITED_METHODS
+
+
+def payload_memory_bytes(value):
+    """Approximate in-memory size of a fetched payload (not the bytes sent over the wire)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class Instrumentation:
+    """Thread-safe collector of timings and counters for one run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = []
+        self.requests = {}
+        self.payload_bytes = {}
+        self.retries = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, stage, ticker=None):
+        """Time the enclosed block as `stage`, optionally attributed to `ticker`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._timings.append((ticker, stage, elapsed))
+
+    def record_request(self, dataset, nbytes=0):
+        with self._lock:
+            self.requests[dataset] = self.requests.get(dataset, 0) + 1
+            self.payload_bytes[dataset] = self.payload_bytes.get(dataset, 0) + nbytes
+
+    def record_retry(self, dataset):
+        with self._lock:
+            self.retries[dataset] = self.retries.get(dataset, 0) + 1
+
+    def timings(self):
+        """DataFrame with one row per timed block: ticker, stage, seconds."""
+        with self._lock:
+            return pd.DataFrame(self._timings, columns=['ticker', 'stage', 'seconds'])
+
+    def summary(self, cache_stats=None):
+        """JSON-serialisable summary of the run."""
+        timings = self.timings()
+        stages = (timings.groupby('stage')['seconds'].agg(['count', 'sum', 'mean', 'max'])
+                  .rename(columns={'sum': 'total'}).sort_values('total', ascending=False))
+        per_ticker = timings.dropna(subset=['ticker'])
+        per_ticker = per_ticker[per_ticker['stage'] == 'analysis'].set_index('ticker')['seconds']
+        with self._lock:
+            summary = {
+                'wall_seconds': time.perf_counter() - self.started,
+                'stages': stages.round(6).to_dict(orient='index'),
+                'slowest_tickers': per_ticker.sort_values(ascending=False).head(10).round(6).to_dict(),
+                'requests': dict(self.requests),
+                'total_requests': sum(self.requests.values()),
+                'payload_bytes': dict(self.payload_bytes),
+                'total_payload_bytes': sum(self.payload_bytes.values()),
+                'retries': dict(self.retries),
+                'total_retries': sum(self.retries.values()),
+            }
+        if cache_stats is not None:
+            summary['cache'] = cache_stats
+        return summary
+
+    def write_json(self, path, cache_stats=None):
+        with open(path, 'w') as f:
+            json.dump(self.summary(cache_stats), f, indent=2, default=str)
+
+    def write_csv(self, path):
+        self.timings().to_csv(path, index=False)
+
+
+class InstrumentedTicker:
+    """Wraps a yf.Ticker so every dataset request is timed, counted and its payload sized."""
+
+    def __init__(self, ticker, instrumentation):
+        self._ticker = ticker
+        self._instrumentation = instrumentation
+        self.ticker = ticker.ticker
+
+    def _record(self, dataset, fetch):
+        with self._instrumentation.stage(f"fetch:{dataset}", self.ticker):
+            value = fetch()
+        self._instrumentation.record_request(dataset, payload_memory_bytes(value))
+        return value
+
+    def __getattr__(self, name):
+        if name in RATE_LIMITED_ATTRIBUTES:
+            return self._record(name, lambda: getattr(self._ticker, name))
+
+        attr = getattr(self._ticker, name)
+        if name in RATE_LIMITED_METHODS:
+            def instrumented(*args, **kwargs):
+                return self._record(name, lambda: attr(*args, **kwargs))
+            return instrumented
+        return attr
+
+
+# Before Python 3.12 a cProfile profiler only sees the thread it was enabled in. From 3.12
+# it runs on sys.monitoring, which is interpreter-wide: one profiler sees every thread, and
+# enabling a second one while it runs raises "Another profiling tool is already active".
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+
+class RunProfiler:
+    """cProfile for the calling thread plus every task wrapped with `wrap`.
+
+    Where cProfile is per-thread, tasks handed to the thread pool each run under
+    their own profiler and the stats are merged; otherwise `wrap` is a no-op and
+    the calling thread's profiler records the tasks itself.
+    """
+
+    def __init__(self):
+        self._main = cProfile.Profile()
+        self._task_profiles = []
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+        if not PER_THREAD_PROFILERS:
+            return func
+
+        def profiled_task(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args, **kwargs)
+            finally:
+                with self._lock:
+                    self._task_profiles.append(profile)
+        return profiled_task
+
+    def dump_stats(self, path):
+        stats = pstats.Stats(self._main)
+        with self._lock:
+            for profile in self._task_profiles:
+                stats.add(profile)
+        stats.dump_stats(path)
+
+
+@contextmanager
+def profiled(path):
+    """Profile the enclosed block and dump the merged stats to `path` (None disables).
+
+    Yields a RunProfiler to pass to run_analysis, or None when disabled.
+    """
+    if path is None:
+        yield None
+        return
+    profiler = RunProfiler()
+    profiler._main.enable()
+    try:
+        yield profiler
+    finally:
+        profiler._main.disable()
+        profiler.dump_stats(path)
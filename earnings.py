@@ -0,0 +1,122 @@
+"""Earnings-calendar stage: fetch only calendar data for a universe and screen it by date.
+
+Answering "which tickers report within N days" needs one small request per
+ticker and no statements or price histories, so the full analysis can be run
+on just the tickers that pass the screen.
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from cache import CachedTicker
+from pipeline import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, HostRateLimiter, fetch_all
+from resilience import CircuitBreaker, ResilientTicker
+
+# Calendar event types kept in the index, with the yfinance calendar key they come from
+CALENDAR_EVENTS = {
+    'earnings': 'Earnings Date',
+    'dividend': 'Dividend Date',
+    'ex_dividend': 'Ex-Dividend Date',
+}
+
+
+def _to_date(value):
+    if isinstance(value, (list, tuple)):
+        # Yahoo gives earnings as a one- or two-date window; the first date is the earliest
+        dates = [_to_date(v) for v in value]
+        dates = [d for d in dates if d is not None]
+        return min(dates) if dates else None
+    try:
+        timestamp = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(timestamp) else timestamp.date()
+
+
+def parse_calendar(calendar):
+    """Return {event type: date or None} from a `Ticker.calendar` value.
+
+    Current yfinance returns a dict keyed by 'Earnings Date', 'Dividend Date' and
+    'Ex-Dividend Date'. Older releases returned a DataFrame, either with those keys
+    as the index or with the next earnings date as the first row's label.
+    """
+    events = dict.fromkeys(CALENDAR_EVENTS)
+    if calendar is None:
+        return events
+
+    if isinstance(calendar, pd.DataFrame):
+        if calendar.empty:
+            return events
+        if any(key in calendar.index for key in CALENDAR_EVENTS.values()):
+            calendar = {key: calendar.loc[key].dropna().tolist() for key in CALENDAR_EVENTS.values() if key in calendar.index}
+        elif any(key in calendar.columns for key in CALENDAR_EVENTS.values()):
+            calendar = {key: calendar[key].dropna().tolist() for key in CALENDAR_EVENTS.values() if key in calendar.columns}
+        else:
+            events['earnings'] = _to_date(calendar.index[0])
+            return events
+
+    for event, key in CALENDAR_EVENTS.items():
+        events[event] = _to_date(calendar.get(key))
+    return events
+
+
+class EarningsCalendarIndex:
+    """Date-sorted index of upcoming calendar events across many tickers."""
+
+    def __init__(self, calendars):
+        # calendars: {ticker: {event type: date or None}}
+        self.calendars = dict(calendars)
+        self._events = {event: [] for event in CALENDAR_EVENTS}
+        for ticker, events in self.calendars.items():
+            for event, event_date in events.items():
+                if event_date is not None:
+                    self._events[event].append((event_date, ticker))
+        for entries in self._events.values():
+            entries.sort()
+        self._dates = {event: [entry[0] for entry in entries] for event, entries in self._events.items()}
+
+    def __len__(self):
+        return len(self.calendars)
+
+    def within(self, days, event='earnings', today=None):
+        """Tickers with `event` between today and `days` days from now, soonest first."""
+        today = today or datetime.now().date()
+        dates = self._dates[event]
+        start = bisect_left(dates, today)
+        end = bisect_right(dates, today + timedelta(days=days))
+        return [ticker for _, ticker in self._events[event][start:end]]
+
+    def upcoming(self, days, event='earnings', today=None):
+        """DataFrame of tickers with `event` in the next `days` days and all their calendar dates."""
+        today = today or datetime.now().date()
+        tickers = self.within(days, event, today)
+        frame = pd.DataFrame([{'Ticker': ticker, **self.calendars[ticker]} for ticker in tickers],
+                             columns=['Ticker', *CALENDAR_EVENTS])
+        frame.insert(1, 'Days Until', [(self.calendars[ticker][event] - today).days for ticker in tickers])
+        return frame
+
+
+def build_calendar_index(tickers, max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+                         cache=None, force_refresh=False, on_complete=None):
+    """Fetch only `Ticker.calendar` for every ticker in parallel and index the results.
+
+    Tickers whose calendar cannot be fetched, even after retries, are indexed with no dates.
+    """
+    import yfinance as yf
+
+    limiter = HostRateLimiter(requests_per_second)
+    breaker = CircuitBreaker()
+
+    def fetch_calendar(ticker):
+        stock = ResilientTicker(yf.Ticker(ticker), limiter, breaker)
+        if cache is not None:
+            stock = CachedTicker(stock, cache, force_refresh=force_refresh)
+        try:
+            return parse_calendar(stock.calendar)
+        except Exception:
+            return parse_calendar(None)
+
+    tickers = list(tickers)
+    calendars = fetch_all(tickers, fetch_calendar, max_workers=max_workers, on_complete=on_complete)
+    return EarningsCalendarIndex(zip(tickers, calendars))
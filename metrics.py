@@ -0,0 +1,136 @@
+"""Vectorized metrics over a whole universe of tickers at once.
+
+Works on a (date x ticker) close panel and a long-format dividends table and
+returns one numeric row per ticker, computed with the same rules as the
+per-ticker path in analysis.get_financial_data.
+"""
+import numpy as np
+import pandas as pd
+
+# Date offsets of the trailing price windows, measured back from today
+PRICE_WINDOW_OFFSETS = {
+    '1M': pd.DateOffset(months=1),
+    '3M': pd.DateOffset(months=3),
+}
+
+# Price trend ladder, checked in order: (label, direction, 1M threshold %, 3M threshold %).
+# Direction +1 requires both changes above the thresholds, -1 both below their negatives.
+PRICE_TREND_RULES = [
+    ("Very Strong Uptrend", 1, 10, 20),
+    ("Strong Uptrend", 1, 5, 10),
+    ("Moderate Uptrend", 1, 2, 5),
+    ("Very Strong Downtrend", -1, 10, 20),
+    ("Strong Downtrend", -1, 5, 10),
+    ("Moderate Downtrend", -1, 2, 5),
+]
+NEUTRAL_TREND = "Neutral Trend"
+
+# Number of most recent dividends used to estimate the payout interval
+DIVIDEND_LOOKBACK = 4
+
+# Columns of the long-format dividends table
+DIVIDEND_COLUMNS = ['Ticker', 'Date', 'Dividend']
+
+
+def build_close_panel(histories):
+    """Combine {ticker: history frame} into a (date x ticker) panel of closes."""
+    return pd.DataFrame({ticker: history['Close'] for ticker, history in histories.items()
+                         if history is not None and not history.empty})
+
+
+def build_dividend_table(dividends):
+    """Combine {ticker: dividends series} into a long table with DIVIDEND_COLUMNS."""
+    dividends = {ticker: series for ticker, series in dividends.items() if series is not None and not series.empty}
+    if not dividends:
+        return pd.DataFrame(columns=DIVIDEND_COLUMNS)
+    # One concat of the series rather than a small frame per ticker
+    values = pd.concat(list(dividends.values()))
+    return pd.DataFrame({'Ticker': np.repeat(list(dividends), [len(series) for series in dividends.values()]),
+                         'Date': values.index, 'Dividend': values.to_numpy()})
+
+
+def _local_naive(dates):
+    # Drop the timezone but keep exchange-local wall time, as Timestamp.date() does
+    return dates.dt.tz_localize(None) if getattr(dates.dt, 'tz', None) is not None else dates
+
+
+def classify_price_trends(change_1m, change_3m):
+    """Vectorized PRICE_TREND_RULES over aligned arrays of 1M and 3M percent changes."""
+    change_1m = np.asarray(change_1m, dtype=float)
+    change_3m = np.asarray(change_3m, dtype=float)
+    conditions = [(direction * change_1m > threshold_1m) & (direction * change_3m > threshold_3m)
+                  for _, direction, threshold_1m, threshold_3m in PRICE_TREND_RULES]
+    labels = [label for label, _, _, _ in PRICE_TREND_RULES]
+    trends = np.select(conditions, labels, default=NEUTRAL_TREND).astype(object)
+    trends[np.isnan(change_1m) | np.isnan(change_3m)] = "N/A"
+    return trends
+
+
+def compute_returns(close_panel, as_of=None):
+    """Return latest close and 1M/3M/1Y percent changes for every column of `close_panel`."""
+    tz = getattr(close_panel.index, 'tz', None)
+    as_of = pd.Timestamp.now(tz=tz) if as_of is None else pd.Timestamp(as_of)
+    if tz is not None and as_of.tzinfo is None:
+        as_of = as_of.tz_localize(tz)
+
+    latest = close_panel.ffill().iloc[-1]
+    anchors = {'1Y': close_panel.bfill().iloc[0]}
+    for name, offset in PRICE_WINDOW_OFFSETS.items():
+        window = close_panel[close_panel.index >= (as_of - offset).normalize()]
+        anchors[name] = window.bfill().iloc[0] if not window.empty else pd.Series(np.nan, index=close_panel.columns)
+
+    returns = pd.DataFrame({'latest_close': latest.astype(float)})
+    for name in ('1M', '3M', '1Y'):
+        anchor = anchors[name].where(anchors[name] != 0)
+        change = (latest - anchor) / anchor * 100
+        returns[f'change_{name.lower()}'] = change.where(latest != 0).astype(float)
+    return returns
+
+
+def compute_dividend_metrics(dividends, as_of=None):
+    """Return dividend growth and the next-dividend estimate for every ticker in `dividends`."""
+    columns = ['dividend_growth', 'predicted_dividend', 'next_dividend_date', 'days_until_dividend']
+    if dividends.empty:
+        empty = pd.DataFrame(columns=columns, dtype=float)
+        return empty.astype({'next_dividend_date': 'datetime64[ns]'})
+
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+    if as_of.tzinfo is not None:
+        as_of = as_of.tz_localize(None)
+
+    dividends = dividends.assign(Date=_local_naive(pd.to_datetime(dividends['Date'])))
+    dividends = dividends.sort_values(['Ticker', 'Date'], kind='stable')
+    by_ticker = dividends.groupby('Ticker', sort=False)
+
+    growth = dividends['Dividend'].pct_change().where(by_ticker.cumcount() > 0)
+    metrics = pd.DataFrame({
+        'dividend_growth': growth.groupby(dividends['Ticker'], sort=False).mean() * 100,
+        'predicted_dividend': by_ticker['Dividend'].last(),
+    })
+
+    recent = by_ticker.tail(DIVIDEND_LOOKBACK)
+    gaps = recent['Date'].diff().where(recent.groupby('Ticker', sort=False).cumcount() > 0)
+    avg_gap = gaps.groupby(recent['Ticker'], sort=False).mean()
+    next_date = recent.groupby('Ticker', sort=False)['Date'].last() + avg_gap
+    metrics['next_dividend_date'] = next_date
+    metrics['days_until_dividend'] = (next_date.dt.normalize() - as_of.normalize()).dt.days.astype(float)
+    metrics.index.name = None
+    return metrics[columns]
+
+
+def compute_universe_metrics(close_panel, dividends, as_of=None):
+    """Compute returns, price trend and dividend metrics for every ticker at once.
+
+    Returns one row per ticker with float columns (NaN where unavailable), a
+    categorical `price_trend` and a datetime `next_dividend_date`.
+    """
+    metrics = compute_returns(close_panel, as_of)
+    metrics['price_trend'] = pd.Categorical(
+        classify_price_trends(metrics['change_1m'], metrics['change_3m']),
+        categories=[label for label, _, _, _ in PRICE_TREND_RULES] + [NEUTRAL_TREND, "N/A"],
+    )
+    dividend_metrics = compute_dividend_metrics(dividends, as_of)
+    tickers = close_panel.columns.append(dividend_metrics.index.difference(close_panel.columns))
+    metrics = metrics.join(dividend_metrics, how='outer').reindex(tickers)
+    metrics['dividend_percentage'] = metrics['predicted_dividend'] / metrics['latest_close'] * 100
+    return metrics
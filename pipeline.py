@@ -0,0 +1,145 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+# Default number of tickers fetched at the same time
+DEFAULT_MAX_WORKERS = 8
+
+# Default ceiling on requests started per second against a single host
+DEFAULT_REQUESTS_PER_SECOND = 4.0
+
+# Floor for the adaptive per-host rate after repeated 429 responses
+MIN_REQUESTS_PER_SECOND = 0.25
+
+# Fraction of the configured rate won back per successful request after throttling
+RATE_RECOVERY_STEP = 0.05
+
+# Default number of symbols per multi-ticker yf.download request
+DEFAULT_CHUNK_SIZE = 50
+
+# yfinance sends every dataset request for a ticker to the Yahoo query host
+YAHOO_HOST = 'query2.finance.yahoo.com'
+
+# yf.Ticker properties and methods that each trigger a request
+RATE_LIMITED_ATTRIBUTES = ('financials', 'balance_sheet', 'cashflow', 'dividends', 'info', 'calendar')
+RATE_LIMITED_METHODS = ('history', 'get_earnings_dates')
+
+
+class HostRateLimiter:
+    """Spaces out requests per host so at most `requests_per_second` start each second.
+
+    The rate adapts per host: `throttle` halves it after a 429 response (down to
+    MIN_REQUESTS_PER_SECOND) and each `recover` after a success steps it back
+    towards `requests_per_second`. Safe to share between threads. A rate of 0 or
+    None disables limiting and adaptation.
+    """
+
+    def __init__(self, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+        self.requests_per_second = requests_per_second
+        self._lock = threading.Lock()
+        self._next_slot = {}
+        self._rates = {}
+
+    def rate(self, host=YAHOO_HOST):
+        """Current requests-per-second allowance for `host`."""
+        with self._lock:
+            return self._rates.get(host, self.requests_per_second)
+
+    def acquire(self, host=YAHOO_HOST):
+        if not self.requests_per_second:
+            return
+        with self._lock:
+            interval = 1.0 / self._rates.get(host, self.requests_per_second)
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def throttle(self, host=YAHOO_HOST):
+        if not self.requests_per_second:
+            return
+        with self._lock:
+            rate = self._rates.get(host, self.requests_per_second)
+            self._rates[host] = max(MIN_REQUESTS_PER_SECOND, rate / 2)
+
+    def recover(self, host=YAHOO_HOST):
+        if not self.requests_per_second:
+            return
+        with self._lock:
+            if host in self._rates:
+                rate = self._rates[host] + self.requests_per_second * RATE_RECOVERY_STEP
+                if rate >= self.requests_per_second:
+                    del self._rates[host]
+                else:
+                    self._rates[host] = rate
+
+
+def fetch_all(tickers, fetch, max_workers=DEFAULT_MAX_WORKERS, on_complete=None):
+    """Run `fetch(ticker)` for every ticker on a bounded thread pool.
+
+    `on_complete(done, total, ticker, result)` is called from the calling thread as
+    each fetch finishes, so it may safely update UI elements. Results are returned
+    in the same order as `tickers`, whatever order the fetches complete in.
+    """
+    tickers = list(tickers)
+    results = [None] * len(tickers)
+    if not tickers:
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as executor:
+        futures = {executor.submit(fetch, ticker): i for i, ticker in enumerate(tickers)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            if on_complete is not None:
+                on_complete(done, len(tickers), tickers[i], results[i])
+
+    return results
+
+
+def split_download(data, tickers):
+    """Split a multi-ticker yf.download frame into one history frame per ticker.
+
+    Tickers Yahoo returned no bars for are left out of the result.
+    """
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single-symbol download may come back without the ticker level
+        data = pd.concat({tickers[0]: data}, axis=1)
+
+    available = set(data.columns.get_level_values(0))
+    for ticker in tickers:
+        if ticker not in available:
+            continue
+        frame = data[ticker].dropna(subset=['Close'])
+        frame.columns.name = None
+        if not frame.empty:
+            frames[ticker] = frame
+    return frames
+
+
+def download_price_histories(tickers, period='1y', chunk_size=DEFAULT_CHUNK_SIZE, limiter=None, start=None):
+    """Download daily histories for many tickers with one yf.download request per chunk.
+
+    Returns {ticker: history frame} shaped like ``Ticker.history(period=period)``:
+    adjusted prices, dividend and split columns, exchange-local timestamps. With
+    `start` the bars from that date on are downloaded instead of the whole period.
+    """
+    import yfinance as yf
+
+    tickers = list(tickers)
+    window = {'period': period} if start is None else {'start': start}
+    frames = {}
+    for offset in range(0, len(tickers), chunk_size):
+        chunk = tickers[offset:offset + chunk_size]
+        if limiter is not None:
+            limiter.acquire()
+        data = yf.download(chunk, **window, group_by='ticker', actions=True, auto_adjust=True,
+                           ignore_tz=False, threads=False, progress=False)
+        frames.update(split_download(data, chunk))
+    return frames
@@ -0,0 +1,276 @@
+"""Recorded and synthetic yfinance stand-ins for offline tests and benchmarks.
+
+Record real responses once on a networked machine:
+    python replay.py record stocks.xlsx fixtures/ --limit 50
+
+then serve them anywhere from ReplayTicker / ReplayUniverse, with optional
+injected latency and failure rates. When no recording is available,
+synthetic_ticker_data generates deterministic data of the same shape.
+"""
+import argparse
+import os
+import pickle
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from cache import HISTORY_PERIOD_OFFSETS
+
+# Datasets captured per ticker. History is recorded as period="5y" and sliced to
+# the requested period on replay; earnings dates with RECORDED_EARNINGS_DATES rows.
+RECORDED_DATASETS = ('financials', 'balance_sheet', 'cashflow', 'dividends', 'info', 'calendar', 'history',
+                     'earnings_dates')
+RECORDED_HISTORY_PERIOD = '5y'
+RECORDED_EARNINGS_DATES = 28
+
+# Datasets served by ReplayTicker methods rather than attributes
+REPLAYED_METHODS = {'history', 'earnings_dates'}
+
+
+class SimulatedHTTPError(Exception):
+    """Injected upstream failure, carrying an HTTP-like status code."""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or f"Simulated HTTP {status}")
+        self.status = status
+
+
+def record_ticker(ticker, directory, stock=None):
+    """Fetch every recorded dataset for `ticker` and pickle them to `directory/<ticker>.pkl`."""
+    stock = stock if stock is not None else yf.Ticker(ticker)
+    data = {}
+    for dataset in RECORDED_DATASETS:
+        try:
+            if dataset == 'history':
+                data[dataset] = stock.history(period=RECORDED_HISTORY_PERIOD)
+            elif dataset == 'earnings_dates':
+                data[dataset] = stock.get_earnings_dates(limit=RECORDED_EARNINGS_DATES)
+            else:
+                data[dataset] = getattr(stock, dataset)
+        except Exception as e:
+            data[dataset] = SimulatedHTTPError(500, f"{dataset} failed while recording: {e}")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, f"{ticker}.pkl"), 'wb') as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return data
+
+
+def load_recordings(directory):
+    """Return {ticker: recorded datasets} for every recording in `directory`."""
+    recordings = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.pkl'):
+            with open(os.path.join(directory, name), 'rb') as f:
+                recordings[name[:-len('.pkl')]] = pickle.load(f)
+    return recordings
+
+
+def synthetic_ticker_data(ticker, seed=None, as_of=None, days=260, tz='Asia/Kolkata'):
+    """Deterministic fake datasets for `ticker`, shaped like real yfinance responses."""
+    rng = np.random.default_rng(seed if seed is not None else sum(map(ord, ticker)))
+    as_of = pd.Timestamp.now(tz=tz).normalize() if as_of is None else pd.Timestamp(as_of, tz=tz).normalize()
+
+    index = pd.bdate_range(end=as_of, periods=days, tz=tz)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.018, days)))
+    history = pd.DataFrame({
+        'Open': closes * (1 + rng.normal(0, 0.003, days)),
+        'High': closes * 1.01,
+        'Low': closes * 0.99,
+        'Close': closes,
+        'Volume': rng.integers(10_000, 1_000_000, days),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
+
+    dividend_dates = pd.DatetimeIndex([as_of - pd.DateOffset(months=3 * i) for i in range(8, 0, -1)])
+    dividends = pd.Series(np.round(np.linspace(1.0, 1.6, 8) * rng.uniform(0.5, 2.0), 2), index=dividend_dates,
+                          name='Dividends')
+
+    years = pd.to_datetime([f"{as_of.year - i}-03-31" for i in range(1, 5)])
+    revenue = rng.uniform(1e9, 5e10) * np.linspace(1.0, 0.8, 4)
+    net_income = revenue * rng.uniform(0.05, 0.2)
+    financials = pd.DataFrame([revenue, net_income, net_income * 1.3, net_income * 1.25],
+                              index=['Total Revenue', 'Net Income', 'Operating Income', 'EBIT'], columns=years)
+    assets = revenue * 2
+    balance_sheet = pd.DataFrame([assets * 0.3, assets * 0.5, assets, assets * 0.55, net_income * 3, revenue * 0.1],
+                                 index=['Total Debt', 'Stockholders Equity', 'Total Assets',
+                                        'Total Liabilities Net Minority Interest', 'Retained Earnings', 'Cash'],
+                                 columns=years)
+    cashflow = pd.DataFrame([net_income * 0.9], index=['Free Cash Flow'], columns=years)
+
+    earnings_date = (as_of + pd.Timedelta(days=int(rng.integers(1, 60)))).date()
+    # Quarterly results back over the whole history plus the upcoming one, newest first like yfinance
+    reported = pd.DatetimeIndex([pd.Timestamp(earnings_date, tz=tz) - pd.DateOffset(months=3 * i)
+                                 for i in range(days // 63 + 1)], name='Earnings Date') + pd.Timedelta(hours=16)
+    estimates = rng.uniform(5, 50, len(reported))
+    actuals = estimates * (1 + rng.normal(0, 0.1, len(reported)))
+    actuals[0] = np.nan
+    earnings_dates = pd.DataFrame({'EPS Estimate': estimates, 'Reported EPS': actuals,
+                                   'Surprise(%)': (actuals / estimates - 1) * 100}, index=reported)
+    return {
+        'financials': financials,
+        'balance_sheet': balance_sheet,
+        'cashflow': cashflow,
+        'dividends': dividends,
+        'info': {'sharesOutstanding': float(rng.integers(10_000_000, 1_000_000_000)),
+                 'dividendYield': float(rng.uniform(0.005, 0.04))},
+        'calendar': {'Earnings Date': [earnings_date],
+                     'Dividend Date': (dividend_dates[-1] + pd.DateOffset(months=3)).date()},
+        'history': history,
+        'earnings_dates': earnings_dates,
+    }
+
+
+def _slice_history(history, period=None, start=None):
+    # Recordings hold the longest history; trim it the way Yahoo would for `period` or `start`
+    if history is None or isinstance(history, Exception) or history.empty:
+        return pd.DataFrame() if history is None else history
+    if start is not None:
+        start = pd.Timestamp(start)
+        if history.index.tz is not None and start.tzinfo is None:
+            start = start.tz_localize(history.index.tz)
+        return history[history.index >= start]
+    if period in HISTORY_PERIOD_OFFSETS:
+        cutoff = (history.index[-1] - HISTORY_PERIOD_OFFSETS[period]).normalize()
+        return history[history.index >= cutoff]
+    return history
+
+
+class ReplayTicker:
+    """yf.Ticker stand-in serving recorded datasets with injected latency and failures.
+
+    Each dataset access sleeps `latency` seconds and then fails with
+    SimulatedHTTPError(`failure_status`) with probability `failure_rate`, either
+    one rate for every dataset or a {dataset: rate} mapping.
+    Recorded errors are raised again on access. `calls` counts accesses per dataset.
+    """
+
+    def __init__(self, ticker, data, latency=0.0, failure_rate=0.0, failure_status=429, rng=None):
+        self.ticker = ticker
+        self._data = data
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._rng = rng or random.Random(ticker)
+        self.calls = {}
+
+    def _serve(self, dataset):
+        self.calls[dataset] = self.calls.get(dataset, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        failure_rate = self.failure_rate.get(dataset, 0.0) if isinstance(self.failure_rate, dict) else self.failure_rate
+        if failure_rate and self._rng.random() < failure_rate:
+            raise SimulatedHTTPError(self.failure_status)
+        value = self._data.get(dataset)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def __getattr__(self, name):
+        if name in RECORDED_DATASETS and name not in REPLAYED_METHODS:
+            return self._serve(name)
+        raise AttributeError(name)
+
+    def history(self, period=None, start=None, **kwargs):
+        return _slice_history(self._serve('history'), period, start)
+
+    def get_earnings_dates(self, limit=12):
+        earnings_dates = self._serve('earnings_dates')
+        return None if earnings_dates is None else earnings_dates.head(limit)
+
+
+class ReplayUniverse:
+    """A set of replayable tickers plus stand-ins for yf.Ticker and yf.download.
+
+    `data` maps ticker -> datasets (from load_recordings or synthetic_ticker_data).
+    Tickers without data get synthetic datasets on first use. `downloads` lists the
+    tickers of each yf.download call.
+    """
+
+    def __init__(self, data=None, latency=0.0, failure_rate=0.0, failure_status=429, seed=0):
+        self.data = dict(data or {})
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.tickers = {}
+        self.downloads = []
+
+    @classmethod
+    def synthetic(cls, tickers, as_of=None, days=260, **kwargs):
+        return cls({ticker: synthetic_ticker_data(ticker, as_of=as_of, days=days) for ticker in tickers}, **kwargs)
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        return cls(load_recordings(directory), **kwargs)
+
+    def _datasets(self, ticker):
+        with self._lock:
+            if ticker not in self.data:
+                self.data[ticker] = synthetic_ticker_data(ticker)
+            return self.data[ticker]
+
+    def ticker(self, symbol):
+        """yf.Ticker replacement."""
+        with self._lock:
+            rng = random.Random(self._rng.random())
+        stock = ReplayTicker(symbol, self._datasets(symbol), self.latency, self.failure_rate, self.failure_status, rng)
+        with self._lock:
+            self.tickers.setdefault(symbol, []).append(stock)
+        return stock
+
+    def download(self, tickers, period=None, start=None, **kwargs):
+        """yf.download replacement returning a (ticker, field) column frame."""
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        with self._lock:
+            self.downloads.append(tickers)
+        if self.latency:
+            time.sleep(self.latency)
+        frames = {ticker: _slice_history(self._datasets(ticker)['history'], period, start) for ticker in tickers}
+        frames = {ticker: frame for ticker, frame in frames.items() if isinstance(frame, pd.DataFrame) and not frame.empty}
+        return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+
+    def request_count(self, dataset=None):
+        """Total requests served, optionally for one dataset; yf.download calls count as 'download'."""
+        with self._lock:
+            stocks = [stock for stocks in self.tickers.values() for stock in stocks]
+            downloads = len(self.downloads) if dataset in (None, 'download') else 0
+        return downloads + sum(count for stock in stocks for name, count in stock.calls.items()
+                               if dataset is None or name == dataset)
+
+    @contextmanager
+    def install(self):
+        """Patch yf.Ticker and yf.download so the app's modules use this universe."""
+        original = yf.Ticker, yf.download
+        yf.Ticker, yf.download = self.ticker, self.download
+        try:
+            yield self
+        finally:
+            yf.Ticker, yf.download = original
+
+
+def main(argv=None):
+    from analysis import load_symbols
+
+    parser = argparse.ArgumentParser(description="Record yfinance responses for offline replay")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record = subparsers.add_parser('record', help="Record every dataset for the symbols in a file")
+    record.add_argument('symbols', help="Symbol file (.xlsx/.csv with a 'Symbol' column, or text)")
+    record.add_argument('directory', help="Directory to write <ticker>.pkl recordings to")
+    record.add_argument('--limit', type=int, help="Record only the first N symbols")
+    args = parser.parse_args(argv)
+
+    tickers = load_symbols(args.symbols)[:args.limit]
+    for i, ticker in enumerate(tickers, start=1):
+        record_ticker(ticker, args.directory)
+        print(f"[{i}/{len(tickers)}] recorded {ticker}", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""Resilient dataset fetches: jittered exponential backoff, adaptive rate and a circuit breaker.
+
+ResilientTicker takes the place of a bare rate limit around yf.Ticker. Each
+dataset request waits for a limiter slot. Transient failures (throttling, 5xx
+responses, dropped connections) are retried with backoff. A 429 also slows the
+shared limiter down, and consecutive failures of a dataset across the run trip
+a breaker so an unavailable endpoint fails fast instead of being retried
+ticker by ticker.
+"""
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+from pipeline import RATE_LIMITED_ATTRIBUTES, RATE_LIMITED_METHODS, YAHOO_HOST
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Exception class-name fragments of network errors from requests/curl_cffi
+TRANSIENT_ERROR_NAMES = ('Timeout', 'ConnectionError', 'RateLimit')
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+def error_status(error):
+    """HTTP status carried by a fetch error, or None."""
+    for candidate in (error, getattr(error, 'response', None)):
+        status = getattr(candidate, 'status', None) or getattr(candidate, 'status_code', None)
+        if isinstance(status, int):
+            return status
+    if type(error).__name__ == 'YFRateLimitError' or 'Too Many Requests' in str(error):
+        return 429
+    return None
+
+
+def is_transient(error):
+    """Whether retrying the request that raised `error` may succeed."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = error_status(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return isinstance(error, (ConnectionError, TimeoutError)) or \
+        any(name in type(error).__name__ for name in TRANSIENT_ERROR_NAMES)
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay(self, attempt):
+        """Full-jitter backoff before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker that opens after `failure_threshold` consecutive transient failures.
+
+    Endpoints are keyed by dataset, since Yahoo serves statements, quotes and
+    prices from different backends that fail independently. While a key is open
+    its requests fail with CircuitOpenError; after `reset_after` seconds one probe
+    request is let through, and its success closes the key again while its
+    failure re-opens it. Safe to share between threads.
+    """
+
+    def __init__(self, failure_threshold=10, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._opened_at = {}
+        self._probing = set()
+
+    def state(self, key):
+        with self._lock:
+            if key not in self._opened_at:
+                return 'closed'
+            if key in self._probing or time.monotonic() - self._opened_at[key] >= self.reset_after:
+                return 'half-open'
+            return 'open'
+
+    def allow(self, key):
+        with self._lock:
+            if key not in self._opened_at:
+                return
+            if key in self._probing or time.monotonic() - self._opened_at[key] < self.reset_after:
+                raise CircuitOpenError(f"Upstream unavailable for {key}, circuit breaker is open")
+            self._probing.add(key)
+
+    def record_success(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            self._opened_at.pop(key, None)
+            self._probing.discard(key)
+
+    def record_failure(self, key):
+        with self._lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if key in self._probing or self._failures[key] >= self.failure_threshold:
+                self._opened_at[key] = time.monotonic()
+                self._probing.discard(key)
+
+
+class ResilientTicker:
+    """Wraps a yf.Ticker so each dataset request is rate limited, retried and circuit broken.
+
+    Retries are reported to `instrumentation.record_retry` when given. The error
+    of the last attempt is raised once retries are exhausted.
+    """
+
+    def __init__(self, ticker, limiter, breaker=None, policy=DEFAULT_RETRY_POLICY, instrumentation=None,
+                 host=YAHOO_HOST):
+        self._ticker = ticker
+        self._limiter = limiter
+        self._breaker = breaker
+        self._policy = policy
+        self._instrumentation = instrumentation
+        self._host = host
+
+    def _fetch(self, dataset, fetch):
+        for attempt in range(self._policy.max_attempts):
+            if self._breaker is not None:
+                self._breaker.allow(dataset)
+            self._limiter.acquire(self._host)
+            try:
+                value = fetch()
+            except Exception as e:
+                if not is_transient(e):
+                    # A permanent error (e.g. 404 for one ticker) still means the endpoint answered,
+                    # which also releases a half-open probe
+                    if self._breaker is not None:
+                        self._breaker.record_success(dataset)
+                    raise
+                if self._breaker is not None:
+                    self._breaker.record_failure(dataset)
+                if error_status(e) == 429:
+                    self._limiter.throttle(self._host)
+                if attempt + 1 == self._policy.max_attempts:
+                    raise
+                if self._instrumentation is not None:
+                    self._instrumentation.record_retry(dataset)
+                delay = self._policy.delay(attempt)
+                logger.info("Retrying %s for %s in %.2fs after: %s", dataset, self.ticker, delay, e)
+                time.sleep(delay)
+            else:
+                if self._breaker is not None:
+                    self._breaker.record_success(dataset)
+                self._limiter.recover(self._host)
+                return value
+
+    def __getattr__(self, name):
+        if name in RATE_LIMITED_ATTRIBUTES:
+            return self._fetch(name, lambda: getattr(self._ticker, name))
+
+        attr = getattr(self._ticker, name)
+        if name in RATE_LIMITED_METHODS:
+            def resilient(*args, **kwargs):
+                return self._fetch(name, lambda: attr(*args, **kwargs))
+            return resilient
+        return attr
@@ -0,0 +1,127 @@
+"""Typed per-ticker analysis results and the formatting used at the display and export edges.
+
+Numbers stay numeric (NaN when unavailable) all the way through the pipeline;
+strings such as "12.34%" or "$1.23" are only produced by the format_* helpers.
+"""
+import math
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Optional
+
+import pandas as pd
+
+NA = "N/A"
+
+
+@dataclass(slots=True)
+class TickerResult:
+    ticker: str
+
+    # Prices (percent changes are in percent, e.g. 12.34)
+    latest_close: float = math.nan
+    change_1m: float = math.nan
+    change_3m: float = math.nan
+    change_1y: float = math.nan
+    price_trend: str = NA
+
+    # Financial statements
+    net_income: float = math.nan
+    operating_income: float = math.nan
+    eps: float = math.nan
+    revenue_growth: float = math.nan
+    retained_earnings: float = math.nan
+    cash_reserves: float = math.nan
+    debt_to_equity: float = math.nan
+    working_capital: float = math.nan
+    free_cash_flow: float = math.nan
+
+    # Dividends
+    dividend_yield: float = math.nan
+    dividend_growth: float = math.nan
+    dividend_percentage: float = math.nan
+    predicted_dividend: float = math.nan
+    past_dividends: tuple = ()
+    next_dividend_date: Optional[date] = None
+    days_until_dividend: float = math.nan
+
+    # Earnings
+    next_earnings_date: Optional[date] = None
+    days_until_earnings: float = math.nan
+    earnings_expectation: str = NA
+    earnings_confidence: str = NA
+
+    # Datasets that could not be fetched; the fields derived from them are unset
+    missing_datasets: tuple = ()
+
+    # 1-year price history kept for charting, never exported
+    historical_data: Optional[pd.DataFrame] = field(default=None, repr=False, compare=False)
+
+
+# Excel/Parquet column name -> TickerResult attribute, in export order
+EXPORT_COLUMNS = {
+    'Ticker': 'ticker',
+    'Latest Price': 'latest_close',
+    '1M Change (%)': 'change_1m',
+    '3M Change (%)': 'change_3m',
+    '1Y Change (%)': 'change_1y',
+    'Price Trend': 'price_trend',
+    'Net Income': 'net_income',
+    'EPS': 'eps',
+    'Revenue Growth (%)': 'revenue_growth',
+    'Debt-to-Equity': 'debt_to_equity',
+    'Dividend Yield (%)': 'dividend_yield',
+    'Next Dividend Date': 'next_dividend_date',
+    'Predicted Dividend': 'predicted_dividend',
+    'Next Earnings Date': 'next_earnings_date',
+    'Days Until Earnings': 'days_until_earnings',
+    'Earnings Expectation': 'earnings_expectation',
+    'Earnings Confidence': 'earnings_confidence',
+    'Missing Data': 'missing_datasets',
+}
+
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def format_percent(value):
+    return NA if is_missing(value) else f"{value:.2f}%"
+
+
+def format_money(value, grouped=False):
+    if is_missing(value):
+        return NA
+    return f"${value:,.2f}" if grouped else f"${value:.2f}"
+
+
+def format_ratio(value):
+    return NA if is_missing(value) else f"{value:.2f}"
+
+
+def format_number(value):
+    return NA if is_missing(value) else f"{value:,.0f}"
+
+
+def format_days(value):
+    return NA if is_missing(value) else f"{int(value)}"
+
+
+def format_date(value):
+    return NA if is_missing(value) else str(value)
+
+
+def sign_class(value):
+    """CSS class for colouring a signed number: 'positive', 'negative' or ''."""
+    if is_missing(value) or value == 0:
+        return ''
+    return 'positive' if value > 0 else 'negative'
+
+
+def results_to_frame(results):
+    """Numeric DataFrame of `results` with EXPORT_COLUMNS, ready for Excel or Parquet."""
+    frame = pd.DataFrame([[getattr(result, attribute) for attribute in EXPORT_COLUMNS.values()] for result in results],
+                         columns=list(EXPORT_COLUMNS))
+    for column in ('Next Dividend Date', 'Next Earnings Date'):
+        frame[column] = pd.to_datetime(frame[column])
+    frame['Missing Data'] = frame['Missing Data'].map(', '.join)
+    return frame
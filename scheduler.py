@@ -0,0 +1,252 @@
+"""Background refresher: keeps a snapshot of every symbol's analysis warm for the app.
+
+Prices are refreshed once per trading day after the market closes; statements,
+dividends, info and calendars on a slower cadence. Each refresh re-runs the
+analysis for the whole universe against the on-disk cache, where only the
+datasets being refreshed are treated as expired, and writes a new snapshot.
+
+Example:
+    python scheduler.py stocks.xlsx --metrics-port 9108
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zoneinfo import ZoneInfo
+
+from analysis import STOCKS_FILE_PATH, load_symbol_index, run_analysis
+from cache import CACHE_PATH, DATASET_TTLS, DiskCache
+from diagnostics import Instrumentation
+from earnings import EarningsCalendarIndex, parse_calendar
+from pipeline import DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND
+from snapshot import SNAPSHOT_DIR, read_snapshot, snapshot_metrics, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Datasets each kind of refresh re-downloads
+REFRESH_DATASETS = {
+    'prices': ('history',),
+    'fundamentals': ('financials', 'balance_sheet', 'cashflow', 'dividends', 'info', 'calendar'),
+}
+
+# Age at which a cached dataset not being refreshed is still served
+KEEP_CACHED = timedelta(days=3650)
+
+# Local time after which the day's closing prices are refreshed (NSE closes at 15:30 IST)
+DEFAULT_PRICE_REFRESH_TIME = '16:00'
+DEFAULT_MARKET_TIMEZONE = 'Asia/Kolkata'
+
+# How often statements, dividends, info and calendars are refreshed
+DEFAULT_FUNDAMENTALS_INTERVAL = timedelta(days=7)
+
+# Seconds between checks for due refreshes and symbol file changes
+POLL_SECONDS = 60
+
+
+def refresh_ttls(kinds):
+    """DiskCache TTLs that expire exactly the datasets of the refresh `kinds`."""
+    refreshed = {dataset for kind in kinds for dataset in REFRESH_DATASETS[kind]}
+    return {dataset: timedelta(0) if dataset in refreshed else KEEP_CACHED for dataset in DATASET_TTLS}
+
+
+def last_market_close(now, refresh_time=DEFAULT_PRICE_REFRESH_TIME, market_timezone=DEFAULT_MARKET_TIMEZONE):
+    """Most recent weekday `refresh_time` in the market's timezone at or before `now`."""
+    hour, minute = map(int, refresh_time.split(':'))
+    local = now.astimezone(ZoneInfo(market_timezone))
+    close = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if close > local:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+def due_refreshes(snapshot, tickers, now, refresh_time=DEFAULT_PRICE_REFRESH_TIME,
+                  market_timezone=DEFAULT_MARKET_TIMEZONE, fundamentals_interval=DEFAULT_FUNDAMENTALS_INTERVAL):
+    """Refresh kinds due at `now` given the current snapshot (None if there is none)."""
+    if snapshot is None:
+        return list(REFRESH_DATASETS)
+    refreshed_at = snapshot.get('refreshed_at', {})
+    kinds = []
+    # New symbols are fetched in full by a price refresh, since nothing of theirs is cached
+    if ('prices' not in refreshed_at or refreshed_at['prices'] < last_market_close(now, refresh_time, market_timezone)
+            or set(tickers) != set(snapshot['symbols'])):
+        kinds.append('prices')
+    if 'fundamentals' not in refreshed_at or now - refreshed_at['fundamentals'] >= fundamentals_interval:
+        kinds.append('fundamentals')
+    return kinds
+
+
+def _compact(result):
+    # Snapshots only need closing prices for charts
+    if result.historical_data is None:
+        return result
+    return replace(result, historical_data=result.historical_data[['Close']])
+
+
+def refresh_snapshot(tickers, kinds, previous=None, snapshot_dir=SNAPSHOT_DIR, cache_path=CACHE_PATH,
+                     max_workers=DEFAULT_MAX_WORKERS, requests_per_second=DEFAULT_REQUESTS_PER_SECOND):
+    """Analyse `tickers`, re-downloading the datasets of `kinds`, and write a new snapshot.
+
+    Tickers that fail keep their result from `previous`, if any, and are listed
+    under 'failed'. Returns the new snapshot.
+    """
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    # Each refresh expires different datasets, so it opens the cache with its own TTLs and closes it after
+    cache = DiskCache(cache_path, ttls=refresh_ttls(kinds))
+    instrumentation = Instrumentation()
+    try:
+        results = run_analysis(tickers, max_workers=max_workers, requests_per_second=requests_per_second, cache=cache,
+                               instrumentation=instrumentation)
+        calendar_index = EarningsCalendarIndex((ticker, parse_calendar(cache.peek(ticker, 'calendar')))
+                                               for ticker in tickers)
+        cache_stats = cache.stats()
+    finally:
+        cache.close()
+    seconds = time.perf_counter() - started
+
+    previous = previous or {}
+    previous_results = previous.get('results', {})
+    snapshot = {
+        'created_at': datetime.now(timezone.utc),
+        'symbols': list(tickers),
+        'results': {ticker: _compact(result) if result is not None else previous_results[ticker]
+                    for ticker, result in zip(tickers, results) if result is not None or ticker in previous_results},
+        'failed': [ticker for ticker, result in zip(tickers, results) if result is None],
+        'calendar_index': calendar_index,
+        'refreshed_at': dict(previous.get('refreshed_at', {}), **dict.fromkeys(kinds, started_at)),
+        'refresh_seconds': dict(previous.get('refresh_seconds', {}), **dict.fromkeys(kinds, seconds)),
+        'diagnostics': instrumentation.summary(cache_stats),
+    }
+    snapshot['version'] = write_snapshot(snapshot, snapshot_dir)
+    logger.info("Refreshed %s for %d tickers in %.1fs (%d failed), snapshot %s", '+'.join(kinds), len(tickers),
+                seconds, len(snapshot['failed']), snapshot['version'])
+    return snapshot
+
+
+def format_prometheus(metrics):
+    """Prometheus text exposition of snapshot_metrics output."""
+    lines = [
+        '# HELP stock_snapshot_age_seconds Seconds since the current snapshot was written.',
+        '# TYPE stock_snapshot_age_seconds gauge',
+        f"stock_snapshot_age_seconds {metrics['age_seconds']:.3f}",
+        '# HELP stock_snapshot_tickers Tickers with a result in the current snapshot.',
+        '# TYPE stock_snapshot_tickers gauge',
+        f"stock_snapshot_tickers {metrics['tickers']}",
+        '# HELP stock_snapshot_failed_tickers Tickers whose last refresh failed.',
+        '# TYPE stock_snapshot_failed_tickers gauge',
+        f"stock_snapshot_failed_tickers {metrics['failed']}",
+        '# HELP stock_refresh_duration_seconds Duration of the last refresh of each kind.',
+        '# TYPE stock_refresh_duration_seconds gauge',
+    ]
+    lines += [f'stock_refresh_duration_seconds{{kind="{kind}"}} {seconds:.3f}'
+              for kind, seconds in metrics['refresh_seconds'].items()]
+    lines += [
+        '# HELP stock_refresh_age_seconds Seconds since the last refresh of each kind started.',
+        '# TYPE stock_refresh_age_seconds gauge',
+    ]
+    lines += [f'stock_refresh_age_seconds{{kind="{kind}"}} {seconds:.3f}'
+              for kind, seconds in metrics['refresh_age_seconds'].items()]
+    return '\n'.join(lines) + '\n'
+
+
+def serve_metrics(port, get_snapshot):
+    """Serve /metrics (Prometheus text) and /metrics.json for `get_snapshot()` on a daemon thread."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = get_snapshot()
+            if self.path not in ('/metrics', '/metrics.json') or snapshot is None:
+                self.send_error(404 if snapshot is not None else 503)
+                return
+            metrics = snapshot_metrics(snapshot)
+            if self.path == '/metrics.json':
+                body, content_type = json.dumps(metrics).encode(), 'application/json'
+            else:
+                body, content_type = format_prometheus(metrics).encode(), 'text/plain; version=0.0.4'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a snapshot of every symbol's analysis fresh for the app")
+    parser.add_argument('symbols', nargs='?', default=STOCKS_FILE_PATH,
+                        help="Symbol file: .xlsx/.csv with a 'Symbol' column, or text with one symbol per line")
+    parser.add_argument('--once', action='store_true', help="Run whatever refresh is due, then exit")
+    parser.add_argument('--status', action='store_true', help="Print the current snapshot's metrics and exit")
+    parser.add_argument('--snapshots', default=SNAPSHOT_DIR, help="Snapshot directory")
+    parser.add_argument('--cache', default=CACHE_PATH, help="On-disk cache location")
+    parser.add_argument('-w', '--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of stocks fetched at the same time")
+    parser.add_argument('--requests-per-second', type=float, default=DEFAULT_REQUESTS_PER_SECOND,
+                        help="Upper bound on requests sent to Yahoo Finance")
+    parser.add_argument('--price-refresh-time', default=DEFAULT_PRICE_REFRESH_TIME, metavar='HH:MM',
+                        help="Market-local time after which each weekday's closing prices are refreshed")
+    parser.add_argument('--market-timezone', default=DEFAULT_MARKET_TIMEZONE, help="Timezone of --price-refresh-time")
+    parser.add_argument('--fundamentals-every', type=float, default=DEFAULT_FUNDAMENTALS_INTERVAL.days, metavar='DAYS',
+                        help="Days between refreshes of statements, dividends, info and calendars")
+    parser.add_argument('--metrics-port', type=int, help="Serve /metrics and /metrics.json on this local port")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    snapshot = read_snapshot(directory=args.snapshots)
+    if args.status:
+        if snapshot is None:
+            print(f"No snapshot in {args.snapshots}", file=sys.stderr)
+            return 1
+        print(json.dumps(snapshot_metrics(snapshot), indent=2))
+        return 0
+
+    if args.metrics_port:
+        serve_metrics(args.metrics_port, lambda: snapshot)
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    fundamentals_interval = timedelta(days=args.fundamentals_every)
+    while not stop.is_set():
+        try:
+            tickers = load_symbol_index(args.symbols)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read symbols from %s: %s", args.symbols, e)
+            tickers = None
+
+        if tickers:
+            kinds = due_refreshes(snapshot, tickers, datetime.now(timezone.utc), args.price_refresh_time,
+                                  args.market_timezone, fundamentals_interval)
+            if kinds:
+                try:
+                    snapshot = refresh_snapshot(tickers, kinds, snapshot, args.snapshots, args.cache, args.workers,
+                                                args.requests_per_second)
+                except Exception:
+                    logger.exception("Refresh of %s failed", '+'.join(kinds))
+
+        if args.once:
+            break
+        stop.wait(POLL_SECONDS)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
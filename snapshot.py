@@ -0,0 +1,80 @@
+"""Atomic, versioned snapshots of a whole-universe analysis, written by scheduler.py and read by the app.
+
+Each snapshot is a pickle named by its version. A small pointer file names the
+current version and is swapped in with os.replace, so readers always load a
+complete snapshot and never one that is still being written.
+"""
+import os
+import pickle
+from datetime import datetime, timezone
+
+# Directory holding snapshot-<version>.pkl files and the pointer file
+SNAPSHOT_DIR = os.path.join('.cache', 'snapshots')
+POINTER_NAME = 'CURRENT'
+
+# Versions kept on disk, so a reader that just read the pointer can still open its file
+SNAPSHOT_KEEP = 3
+
+
+def _atomic_write(path, data):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+def _snapshot_path(directory, version):
+    return os.path.join(directory, f"snapshot-{version}.pkl")
+
+
+def write_snapshot(snapshot, directory=SNAPSHOT_DIR):
+    """Write `snapshot` (a dict) as a new version, make it current and prune old versions.
+
+    Returns the new version, a sortable UTC timestamp.
+    """
+    os.makedirs(directory, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    snapshot = dict(snapshot, version=version)
+    _atomic_write(_snapshot_path(directory, version), pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    _atomic_write(os.path.join(directory, POINTER_NAME), version.encode())
+
+    versions = sorted(name for name in os.listdir(directory) if name.startswith('snapshot-') and name.endswith('.pkl'))
+    for name in versions[:-SNAPSHOT_KEEP]:
+        os.remove(os.path.join(directory, name))
+    return version
+
+
+def current_version(directory=SNAPSHOT_DIR):
+    """Version named by the pointer file, or None if no snapshot has been written."""
+    try:
+        with open(os.path.join(directory, POINTER_NAME)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_snapshot(version=None, directory=SNAPSHOT_DIR):
+    """Load snapshot `version` (the current one if None), or None if there is none."""
+    version = version or current_version(directory)
+    if version is None:
+        return None
+    with open(_snapshot_path(directory, version), 'rb') as f:
+        return pickle.load(f)
+
+
+def snapshot_metrics(snapshot, now=None):
+    """Age, coverage and refresh timings of `snapshot`, JSON-serialisable."""
+    now = now or datetime.now(timezone.utc)
+    refreshed_at = snapshot.get('refreshed_at', {})
+    return {
+        'version': snapshot['version'],
+        'created_at': snapshot['created_at'].isoformat(),
+        'age_seconds': (now - snapshot['created_at']).total_seconds(),
+        'tickers': len(snapshot['results']),
+        'failed': len(snapshot['failed']),
+        'refreshed_at': {kind: when.isoformat() for kind, when in refreshed_at.items()},
+        'refresh_age_seconds': {kind: (now - when).total_seconds() for kind, when in refreshed_at.items()},
+        'refresh_seconds': dict(snapshot.get('refresh_seconds', {})),
+    }
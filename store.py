@@ -0,0 +1,132 @@
+"""Append-only store of analysis runs.
+
+Every run is a timestamped partition in a SQLite database and each ticker's
+result is inserted as soon as it finishes, so saving costs the same no matter
+how many earlier runs exist. Excel files are produced on demand from queries.
+"""
+import math
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from results import EXPORT_COLUMNS
+
+# Default location of the run store
+RUN_STORE_PATH = 'dividend_predictions.sqlite'
+
+# Result attributes stored per row; the ticker is part of the key
+RESULT_FIELDS = [attribute for attribute in EXPORT_COLUMNS.values() if attribute != 'ticker']
+DATE_FIELDS = ('next_dividend_date', 'next_earnings_date')
+INSERT_COLUMNS = ', '.join(['run_id', 'ticker', 'written_at'] + RESULT_FIELDS)
+TEXT_FIELDS = ('price_trend', 'earnings_expectation', 'earnings_confidence', 'missing_datasets')
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def _to_sql(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, tuple):
+        return ', '.join(value)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class RunStore:
+    """SQLite-backed store of runs and their per-ticker results. Safe to share between threads."""
+
+    def __init__(self, path=RUN_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+
+        field_columns = ', '.join(f"{name} {'TEXT' if name in DATE_FIELDS + TEXT_FIELDS else 'REAL'}"
+                                  for name in RESULT_FIELDS)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TEXT NOT NULL,
+                source TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                run_id INTEGER NOT NULL REFERENCES runs (run_id),
+                ticker TEXT NOT NULL,
+                written_at TEXT NOT NULL,
+                {field_columns},
+                PRIMARY KEY (run_id, ticker)
+            );
+            CREATE INDEX IF NOT EXISTS results_by_ticker ON results (ticker, written_at);
+        """)
+        # Stores created before a field existed get the column added, empty for older runs
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        for name in RESULT_FIELDS:
+            if name not in existing:
+                column_type = 'TEXT' if name in DATE_FIELDS + TEXT_FIELDS else 'REAL'
+                self._conn.execute(f"ALTER TABLE results ADD COLUMN {name} {column_type}")
+        self._conn.commit()
+
+    def start_run(self, source='app'):
+        """Open a new run partition and return its id."""
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO runs (started_at, source) VALUES (?, ?)", (_utc_now(), source))
+            self._conn.commit()
+        return cursor.lastrowid
+
+    def append(self, run_id, result):
+        """Insert one TickerResult into `run_id`."""
+        values = [run_id, result.ticker, _utc_now()] + [_to_sql(getattr(result, name)) for name in RESULT_FIELDS]
+        placeholders = ', '.join('?' * len(values))
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO results ({INSERT_COLUMNS}) VALUES ({placeholders})", values)
+            self._conn.commit()
+
+    def runs(self, limit=None):
+        """Runs with their result counts, newest first; only the latest `limit` if given."""
+        with self._lock:
+            return pd.read_sql_query("""
+                SELECT runs.run_id, runs.started_at, runs.source, COUNT(results.ticker) AS tickers
+                FROM (SELECT * FROM runs ORDER BY run_id DESC LIMIT ?) AS runs
+                LEFT JOIN results ON results.run_id = runs.run_id
+                GROUP BY runs.run_id ORDER BY runs.run_id DESC
+            """, self._conn, params=(-1 if limit is None else limit,))
+
+    def query(self, ticker=None, run_id=None, start=None, end=None):
+        """Stored results filtered by ticker (str or list), run id and written-at date range."""
+        clauses, params = [], []
+        if ticker is not None:
+            tickers = [ticker] if isinstance(ticker, str) else list(ticker)
+            clauses.append(f"results.ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(tickers)
+        if run_id is not None:
+            clauses.append("results.run_id = ?")
+            params.append(run_id)
+        if start is not None:
+            clauses.append("results.written_at >= ?")
+            params.append(pd.Timestamp(start).isoformat())
+        if end is not None:
+            clauses.append("results.written_at < ?")
+            params.append(pd.Timestamp(end).isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            frame = pd.read_sql_query(f"""
+                SELECT results.*, runs.started_at FROM results JOIN runs ON runs.run_id = results.run_id
+                {where} ORDER BY results.run_id, results.written_at
+            """, self._conn, params=params)
+        for name in DATE_FIELDS:
+            frame[name] = pd.to_datetime(frame[name])
+        return frame
+
+    def export_xlsx(self, target, **filters):
+        """Write the results matching `filters` (see query) to an .xlsx path or file-like object."""
+        frame = self.query(**filters)
+        labels = {attribute: label for label, attribute in EXPORT_COLUMNS.items()}
+        export = frame.rename(columns=dict(labels, run_id='Run', started_at='Run Started', written_at='Written At'))
+        export = export[['Run', 'Run Started', 'Written At'] + list(EXPORT_COLUMNS)]
+        export.to_excel(target, index=False, sheet_name='Results')
+        return len(export)
@@ -0,0 +1,77 @@
+"""Per-ticker analysis against the call-counting replay stand-in."""
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from analysis import compute_price_windows, get_financial_data, run_analysis
+from cache import DiskCache
+from replay import ReplayTicker, ReplayUniverse, synthetic_ticker_data
+
+TICKER = 'SYM00.NS'
+
+
+@pytest.fixture(scope='module')
+def ticker_data():
+    return synthetic_ticker_data(TICKER)
+
+
+def test_one_history_request_per_ticker(ticker_data):
+    stock = ReplayTicker(TICKER, ticker_data)
+    result = get_financial_data(TICKER, stock=stock)
+    assert result is not None and not result.missing_datasets
+    assert stock.calls['history'] == 1
+
+
+@pytest.mark.parametrize('as_of, anchor_1m, anchor_3m', [
+    # 31 March less a month is Saturday 28 February, so the window opens on Monday 2 March
+    ('2026-03-31 15:00', '2026-03-02', '2025-12-31'),
+    # A window starting on a trading day includes that day's close
+    ('2026-03-02 15:00', '2026-02-02', '2025-12-02'),
+])
+def test_window_anchors_on_a_month_end_calendar(as_of, anchor_1m, anchor_3m):
+    index = pd.bdate_range('2025-12-01', as_of[:10], tz='Asia/Kolkata')
+    # Each close encodes its own date, so an anchor names the bar it came from
+    history = pd.DataFrame({'Close': [float(day.strftime('%Y%m%d')) for day in index]}, index=index)
+    latest, close_1m, close_3m, close_1y = compute_price_windows(history, as_of=as_of)
+    assert latest == float(as_of[:10].replace('-', ''))
+    assert close_1m == float(anchor_1m.replace('-', ''))
+    assert close_3m == float(anchor_3m.replace('-', ''))
+    assert close_1y == 20251201.0
+
+
+def test_expired_histories_are_topped_up_in_one_batch(tmp_path):
+    tickers = [f"SYM{i:02d}.NS" for i in range(5)]
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), ttls={'history': timedelta(0)})
+    universe = ReplayUniverse.synthetic(tickers, days=300)
+    full = {ticker: data['history'] for ticker, data in universe.data.items()}
+    for ticker in tickers:
+        universe.data[ticker]['history'] = full[ticker].iloc[:-3]
+    with universe.install():
+        run_analysis(tickers, requests_per_second=0, cache=cache)
+        for ticker in tickers:
+            universe.data[ticker]['history'] = full[ticker]
+        results = run_analysis(tickers, requests_per_second=0, cache=cache)
+
+    # The first run downloads every series, the second only the bars since the last completed one
+    assert universe.downloads == [tickers, tickers] and universe.request_count('history') == 0
+    assert cache.stats()['datasets']['history']['updates'] == len(tickers)
+    for ticker, result in zip(tickers, results):
+        cutoff = (pd.Timestamp.now(tz=full[ticker].index.tz) - pd.DateOffset(years=1)).normalize()
+        pd.testing.assert_frame_equal(result.historical_data, full[ticker][full[ticker].index >= cutoff])
+
+
+def test_readjusted_histories_are_downloaded_again_in_a_batch(tmp_path):
+    tickers = [f"SYM{i:02d}.NS" for i in range(3)]
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), ttls={'history': timedelta(0)})
+    universe = ReplayUniverse.synthetic(tickers)
+    with universe.install():
+        run_analysis(tickers, requests_per_second=0, cache=cache)
+        readjusted = universe.data[tickers[0]]['history'].copy()
+        readjusted['Close'] *= 0.98
+        universe.data[tickers[0]]['history'] = readjusted
+        results = run_analysis(tickers, requests_per_second=0, cache=cache)
+
+    assert universe.downloads == [tickers, tickers, tickers[:1]]
+    assert results[0].latest_close == readjusted['Close'].iloc[-1]
+    assert cache.stats()['datasets']['history']['updates'] == len(tickers) - 1
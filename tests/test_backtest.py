@@ -0,0 +1,79 @@
+"""Backtest replay checked against the live labelling path and the replay stand-in."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import classify_earnings_expectation, classify_price_trend, compute_price_windows
+from backtest import prepare_series, replay_events, run_backtest, score_events
+from cache import DiskCache
+from replay import ReplayUniverse, synthetic_ticker_data
+
+TICKERS = [f"SYM{i:02d}.NS" for i in range(6)]
+
+
+@pytest.fixture(scope='module')
+def ticker_data():
+    return {ticker: synthetic_ticker_data(ticker, days=1300) for ticker in TICKERS}
+
+
+@pytest.fixture(scope='module')
+def events(ticker_data):
+    series = {ticker: prepare_series(data['history']['Close'], data['earnings_dates'].index)
+              for ticker, data in ticker_data.items()}
+    return replay_events(series, processes=1)
+
+
+def test_labels_match_the_live_path(ticker_data, events):
+    labelled = events[events['price_trend'] != "N/A"]
+    for row in labelled.sample(20, random_state=0).itertuples():
+        history = ticker_data[row.ticker]['history']
+        as_of = pd.Timestamp(row.as_of_date).tz_localize(history.index.tz)
+        visible = history[history.index < as_of + pd.Timedelta(days=1)]
+        latest, close_1m, close_3m, _ = compute_price_windows(visible, as_of=as_of)
+        change_1m = (latest - close_1m) / close_1m * 100
+        change_3m = (latest - close_3m) / close_3m * 100
+        assert row.change_1m == pytest.approx(change_1m) and row.change_3m == pytest.approx(change_3m)
+        trend = classify_price_trend(change_1m, change_3m)
+        assert row.price_trend == trend
+        assert (row.earnings_expectation, row.earnings_confidence) == classify_earnings_expectation(trend, row.lead)
+
+
+def test_forward_returns_start_from_the_last_close_before_the_report(ticker_data, events):
+    row = events.dropna(subset=['return_20d']).iloc[0]
+    closes = ticker_data[row.ticker]['history']['Close']
+    dates = closes.index.tz_localize(None).normalize()
+    base = np.searchsorted(dates, row.report_date) - 1
+    assert row.return_1d == pytest.approx((closes.iloc[base + 1] / closes.iloc[base] - 1) * 100)
+    assert row.return_20d == pytest.approx((closes.iloc[base + 20] / closes.iloc[base] - 1) * 100)
+
+
+def test_process_pool_matches_in_process(ticker_data, events):
+    series = {ticker: prepare_series(data['history']['Close'], data['earnings_dates'].index)
+              for ticker, data in ticker_data.items()}
+    pooled = replay_events(series, processes=2, chunk_size=2)
+    pd.testing.assert_frame_equal(pooled, events)
+
+
+def test_scores_per_label():
+    events = pd.DataFrame({
+        'earnings_expectation': ["Positive (x)", "Positive (x)", "Negative (x)", "Neutral (x)", "N/A"],
+        'earnings_confidence': ["Medium-High", "Medium-High", "Medium-High", "Medium", "N/A"],
+        'return_1d': [2.0, -1.0, -3.0, 1.0, 50.0],
+    })
+    scores = score_events(events, horizons=(1,))
+    positive = scores.loc[("Positive (x)", "Medium-High")]
+    assert positive['events'] == 2 and positive['mean_1d'] == 0.5 and positive['hit_rate_1d'] == 0.5
+    assert scores.loc[("Negative (x)", "Medium-High"), 'hit_rate_1d'] == 1.0
+    assert np.isnan(scores.loc[("Neutral (x)", "Medium"), 'hit_rate_1d'])
+    assert positive['excess_1d'] == pytest.approx(0.5 - (-0.25))
+
+
+def test_repeat_backtest_is_served_from_the_cache(tmp_path, ticker_data):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    universe = ReplayUniverse(ticker_data)
+    with universe.install():
+        events, scores = run_backtest(TICKERS, cache=cache, requests_per_second=0, processes=1)
+        requests = universe.request_count()
+        run_backtest(TICKERS, cache=cache, requests_per_second=0, processes=1)
+    assert requests == 2 * len(TICKERS) and universe.request_count() == requests
+    assert set(events['ticker']) == set(TICKERS) and not scores.empty
@@ -0,0 +1,111 @@
+"""DiskCache expiry and eviction, and incremental refresh of rolling histories."""
+import time
+from datetime import timedelta
+
+import pandas as pd
+import pytest
+
+from cache import CachedTicker, DiskCache
+from replay import ReplayTicker, synthetic_ticker_data
+
+TICKER = 'SYM00.NS'
+
+
+@pytest.fixture(scope='module')
+def full_history():
+    # Longer than a year, so a 1y window has bars to trim as it rolls forward
+    return synthetic_ticker_data(TICKER, days=300)['history']
+
+
+@pytest.fixture
+def expired_cache(tmp_path):
+    # A zero TTL expires every history as soon as it is stored
+    return DiskCache(str(tmp_path / 'cache.sqlite'), ttls={'history': timedelta(0)})
+
+
+def refresh(cache, stored, latest):
+    """Store `stored` as a 1y history, then refresh it once upstream serves `latest`."""
+    data = {'history': stored}
+    stock = ReplayTicker(TICKER, data)
+    first = CachedTicker(stock, cache).history(period='1y')
+    data['history'] = latest
+    return first, CachedTicker(stock, cache).history(period='1y'), stock
+
+
+def one_year(history):
+    return history[history.index >= (pd.Timestamp.now(tz=history.index.tz) - pd.DateOffset(years=1)).normalize()]
+
+
+def test_expiry_follows_the_dataset_ttl(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), ttls={'info': timedelta(0)})
+    cache.put(TICKER, 'info', {'a': 1})
+    cache.put(TICKER, 'history:period=1y', 'bars')
+    time.sleep(0.01)
+    assert cache.get(TICKER, 'info') == (False, None)
+    assert cache.get(TICKER, 'history:period=1y') == (True, 'bars')
+    assert cache.peek(TICKER, 'info') == {'a': 1}
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'), max_bytes=1000)
+    cache.put('A', 'info', b'x' * 400)
+    cache.put('B', 'info', b'x' * 400)
+    time.sleep(0.01)
+    cache.get('A', 'info')
+    cache.put('C', 'info', b'x' * 400)
+    assert cache.peek('B', 'info') is None
+    assert cache.peek('A', 'info') is not None and cache.peek('C', 'info') is not None
+
+
+def test_fresh_history_is_not_requested_again(tmp_path, full_history):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    stock = ReplayTicker(TICKER, {'history': full_history})
+    CachedTicker(stock, cache).history(period='1y')
+    CachedTicker(stock, cache).history(period='1y')
+    assert stock.calls['history'] == 1
+
+
+def test_new_bars_are_merged_and_the_window_trimmed(expired_cache, full_history):
+    first, refreshed, stock = refresh(expired_cache, full_history.iloc[:-3], full_history)
+    assert stock.calls['history'] == 2
+    pd.testing.assert_frame_equal(refreshed, one_year(full_history))
+    assert refreshed.index[0] > first.index[0]
+    assert expired_cache.stats()['updates'] == 1
+
+
+def test_partial_last_bar_is_overwritten(expired_cache, full_history):
+    partial = full_history.iloc[:-1].copy()
+    partial.iloc[-1, partial.columns.get_loc('Close')] *= 1.01
+    _, refreshed, stock = refresh(expired_cache, partial, full_history)
+    assert stock.calls['history'] == 2
+    pd.testing.assert_frame_equal(refreshed, one_year(full_history))
+
+
+def test_readjusted_history_is_downloaded_again(expired_cache, full_history):
+    readjusted = full_history.copy()
+    readjusted['Close'] *= 0.98
+    _, refreshed, stock = refresh(expired_cache, full_history.iloc[:-3], readjusted)
+    assert stock.calls['history'] == 3
+    pd.testing.assert_frame_equal(refreshed, stock.history(period='1y'))
+
+
+def test_new_dividend_invalidates_the_stored_series(expired_cache, full_history):
+    with_dividend = full_history.copy()
+    with_dividend.iloc[-1, with_dividend.columns.get_loc('Dividends')] = 2.5
+    _, refreshed, stock = refresh(expired_cache, full_history.iloc[:-3], with_dividend)
+    assert stock.calls['history'] == 3
+    assert refreshed['Dividends'].iloc[-1] == 2.5
+
+
+def test_stats_since_cover_only_later_lookups(tmp_path):
+    cache = DiskCache(str(tmp_path / 'cache.sqlite'))
+    cache.put(TICKER, 'info', {'a': 1})
+    cache.get(TICKER, 'info')
+    cache.get(TICKER, 'calendar')
+    before = cache.stats()
+    cache.get(TICKER, 'info')
+    run = cache.stats(since=before)
+    assert (run['hits'], run['misses'], run['hit_rate']) == (1, 0, 1.0)
+    assert run['datasets'] == {'info': {'hits': 1, 'misses': 0, 'updates': 0}}
+    assert cache.stats()['hit_rate'] == pytest.approx(2 / 3)
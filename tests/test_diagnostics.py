@@ -0,0 +1,18 @@
+"""Profiling runs that hand work to a thread pool."""
+import pstats
+
+from diagnostics import profiled
+from pipeline import fetch_all
+
+
+def _worker_task(ticker):
+    return sum(range(1000)) and ticker
+
+
+def test_profiled_run_covers_worker_threads(tmp_path):
+    path = str(tmp_path / 'run.prof')
+    with profiled(path) as profiler:
+        results = fetch_all([f"SYM{i:02d}.NS" for i in range(8)], profiler.wrap(_worker_task), max_workers=4)
+    assert results == [f"SYM{i:02d}.NS" for i in range(8)]
+    calls = {function: stats[1] for (_, _, function), stats in pstats.Stats(path).stats.items()}
+    assert calls['_worker_task'] == 8
@@ -0,0 +1,57 @@
+"""Calendar parsing across yfinance formats and the earnings-date range queries."""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from analysis import get_financial_data
+from earnings import EarningsCalendarIndex, parse_calendar
+from replay import ReplayTicker, synthetic_ticker_data
+
+TODAY = date(2026, 10, 16)
+
+
+def test_dict_calendar_with_a_two_date_earnings_window():
+    events = parse_calendar({'Earnings Date': [date(2026, 11, 5), date(2026, 11, 3)],
+                             'Dividend Date': date(2026, 12, 1), 'Ex-Dividend Date': None})
+    assert events == {'earnings': date(2026, 11, 3), 'dividend': date(2026, 12, 1), 'ex_dividend': None}
+
+
+def test_dataframe_keyed_by_index():
+    calendar = pd.DataFrame([[pd.Timestamp('2026-11-03'), pd.Timestamp('2026-11-05')],
+                             [pd.Timestamp('2026-09-20'), None]],
+                            index=['Earnings Date', 'Ex-Dividend Date'], columns=[0, 1])
+    assert parse_calendar(calendar) == {'earnings': date(2026, 11, 3), 'dividend': None,
+                                        'ex_dividend': date(2026, 9, 20)}
+
+
+def test_legacy_dataframe_with_the_date_as_row_label():
+    calendar = pd.DataFrame({'Value': [1.5]}, index=[pd.Timestamp('2026-11-03')])
+    assert parse_calendar(calendar)['earnings'] == date(2026, 11, 3)
+
+
+def test_missing_or_empty_calendars_have_no_dates():
+    assert parse_calendar(None) == parse_calendar(pd.DataFrame()) == parse_calendar({}) == \
+        {'earnings': None, 'dividend': None, 'ex_dividend': None}
+
+
+def test_within_includes_today_and_the_last_day():
+    calendars = {ticker: {'earnings': TODAY + timedelta(days=offset), 'dividend': None, 'ex_dividend': None}
+                 for ticker, offset in [('PAST', -1), ('TODAY', 0), ('LAST', 7), ('LATER', 8)]}
+    calendars['NONE'] = parse_calendar(None)
+    index = EarningsCalendarIndex(calendars)
+    assert index.within(7, today=TODAY) == ['TODAY', 'LAST']
+    assert index.within(0, today=TODAY) == ['TODAY']
+    assert index.within(7, event='dividend', today=TODAY) == []
+
+    upcoming = index.upcoming(7, today=TODAY)
+    assert upcoming['Ticker'].tolist() == ['TODAY', 'LAST'] and upcoming['Days Until'].tolist() == [0, 7]
+    assert len(index) == 5
+
+
+def test_analysis_reads_earnings_through_parse_calendar():
+    earnings_date = date.today() + timedelta(days=5)
+    data = dict(synthetic_ticker_data('SYM00.NS'),
+                calendar=pd.DataFrame([[pd.Timestamp(earnings_date)]], index=['Earnings Date'], columns=[0]))
+    result = get_financial_data('SYM00.NS', stock=ReplayTicker('SYM00.NS', data))
+    assert result.next_earnings_date == earnings_date and result.days_until_earnings == 5
+    assert result.earnings_confidence in ("High", "Medium")
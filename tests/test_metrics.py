@@ -0,0 +1,31 @@
+"""The vectorized metrics engine checked against the per-ticker analysis path."""
+import pandas as pd
+import pytest
+
+from analysis import get_financial_data
+from metrics import build_close_panel, build_dividend_table, compute_universe_metrics
+from replay import ReplayTicker, synthetic_ticker_data
+
+# Histories of different lengths leave gaps at the start of the close panel
+TICKER_DAYS = {f"SYM{i:02d}.NS": 260 if i % 3 else 150 for i in range(12)}
+FLOAT_FIELDS = ('latest_close', 'change_1m', 'change_3m', 'change_1y', 'dividend_growth', 'predicted_dividend',
+                'days_until_dividend', 'dividend_percentage')
+
+
+@pytest.fixture(scope='module')
+def ticker_data():
+    return {ticker: synthetic_ticker_data(ticker, days=days) for ticker, days in TICKER_DAYS.items()}
+
+
+def test_universe_metrics_match_per_ticker_results(ticker_data):
+    metrics = compute_universe_metrics(
+        build_close_panel({ticker: data['history'] for ticker, data in ticker_data.items()}),
+        build_dividend_table({ticker: data['dividends'] for ticker, data in ticker_data.items()}))
+
+    for ticker, data in ticker_data.items():
+        result = get_financial_data(ticker, stock=ReplayTicker(ticker, data))
+        row = metrics.loc[ticker]
+        for field in FLOAT_FIELDS:
+            assert row[field] == pytest.approx(getattr(result, field), nan_ok=True), field
+        assert row['price_trend'] == result.price_trend
+        assert pd.Timestamp(row['next_dividend_date']).date() == result.next_dividend_date
@@ -0,0 +1,114 @@
+"""Fetch-layer resilience against the fault-injecting replay stand-in."""
+import math
+import time
+
+import pytest
+
+from analysis import run_analysis
+from diagnostics import Instrumentation
+from pipeline import MIN_REQUESTS_PER_SECOND, HostRateLimiter
+from replay import ReplayUniverse, SimulatedHTTPError, synthetic_ticker_data
+from resilience import CircuitBreaker, CircuitOpenError, ResilientTicker, RetryPolicy, error_status, is_transient
+
+FAST_RETRIES = RetryPolicy(max_attempts=10, base_delay=0.001, max_delay=0.005)
+TICKERS = [f"SYM{i:02d}.NS" for i in range(20)]
+
+
+@pytest.fixture(scope='module')
+def ticker_data():
+    return {ticker: synthetic_ticker_data(ticker) for ticker in TICKERS}
+
+
+def analyse(universe, **kwargs):
+    with universe.install():
+        return run_analysis(TICKERS, requests_per_second=0, batch_prices=False, retry_policy=FAST_RETRIES, **kwargs)
+
+
+def test_throttled_requests_are_retried(ticker_data):
+    instrumentation = Instrumentation()
+    results = analyse(ReplayUniverse(ticker_data, failure_rate=0.2, seed=3), instrumentation=instrumentation)
+    assert all(result is not None and not result.missing_datasets for result in results)
+    assert instrumentation.summary()['total_retries'] > 0
+
+
+def test_missing_datasets_give_partial_results(ticker_data):
+    results = analyse(ReplayUniverse(ticker_data, failure_rate={'info': 1.0, 'calendar': 1.0}))
+    for result in results:
+        assert result.missing_datasets == ('info', 'calendar')
+        assert math.isnan(result.eps) and result.next_earnings_date is None
+        assert not math.isnan(result.latest_close) and not math.isnan(result.net_income)
+
+
+def test_outage_trips_the_breaker(ticker_data):
+    universe = ReplayUniverse(ticker_data, failure_rate=1.0, failure_status=503)
+    results = analyse(universe, max_workers=4)
+    assert results == [None] * len(TICKERS)
+    # Without the breakers this would be 20 tickers x 7 datasets x 10 attempts = 1400
+    assert universe.request_count() < 7 * 20
+
+
+def test_permanent_errors_are_not_retried(ticker_data):
+    universe = ReplayUniverse(ticker_data, failure_rate={'info': 1.0}, failure_status=404)
+    stock = universe.ticker(TICKERS[0])
+    with pytest.raises(SimulatedHTTPError):
+        ResilientTicker(stock, HostRateLimiter(0), CircuitBreaker(), FAST_RETRIES).info
+    assert stock.calls == {'info': 1}
+
+
+def test_rate_adapts_to_throttling():
+    limiter = HostRateLimiter(8)
+    limiter.throttle()
+    assert limiter.rate() == 4
+    for _ in range(100):
+        limiter.throttle()
+    assert limiter.rate() == MIN_REQUESTS_PER_SECOND
+    for _ in range(100):
+        limiter.recover()
+    assert limiter.rate() == 8
+
+
+def test_breaker_probes_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.05)
+    breaker.record_failure('info')
+    breaker.allow('info')
+    breaker.record_failure('info')
+    with pytest.raises(CircuitOpenError):
+        breaker.allow('info')
+    breaker.allow('history')
+    time.sleep(0.06)
+    breaker.allow('info')
+    with pytest.raises(CircuitOpenError):
+        breaker.allow('info')
+    breaker.record_success('info')
+    assert breaker.state('info') == 'closed'
+
+
+def test_error_classification():
+    class YFRateLimitError(Exception):
+        pass
+
+    class ReadTimeout(OSError):
+        pass
+
+    assert error_status(YFRateLimitError("Too Many Requests. Rate limited.")) == 429
+    assert is_transient(SimulatedHTTPError(503)) and is_transient(ReadTimeout())
+    assert not is_transient(SimulatedHTTPError(404)) and not is_transient(KeyError('Net Income'))
+    assert not is_transient(CircuitOpenError())
+
+
+def test_missing_history_is_not_a_price_error(ticker_data, caplog):
+    results = analyse(ReplayUniverse(ticker_data, failure_rate={'history': 1.0}, failure_status=404))
+    assert all(result.missing_datasets == ('history',) and result.historical_data is None for result in results)
+    assert "Could not compute price data" not in caplog.text
+
+
+def test_permanent_error_on_a_probe_closes_the_breaker(ticker_data):
+    breaker = CircuitBreaker(failure_threshold=1, reset_after=0.01)
+    breaker.record_failure('info')
+    time.sleep(0.02)
+    delisted = ReplayUniverse(ticker_data, failure_rate={'info': 1.0}, failure_status=404).ticker(TICKERS[0])
+    with pytest.raises(SimulatedHTTPError):
+        ResilientTicker(delisted, HostRateLimiter(0), breaker, FAST_RETRIES).info
+    assert breaker.state('info') == 'closed'
+    healthy = ReplayUniverse(ticker_data).ticker(TICKERS[1])
+    assert ResilientTicker(healthy, HostRateLimiter(0), breaker, FAST_RETRIES).info == ticker_data[TICKERS[1]]['info']
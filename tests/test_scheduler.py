@@ -0,0 +1,73 @@
+"""Scheduler cadence and snapshot versioning against the replay stand-in."""
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import snapshot
+from replay import RECORDED_DATASETS, ReplayUniverse, SimulatedHTTPError
+from results import TickerResult
+from scheduler import due_refreshes, refresh_snapshot, refresh_ttls
+
+IST = ZoneInfo('Asia/Kolkata')
+TICKERS = [f"SYM{i:02d}.NS" for i in range(10)]
+
+
+@pytest.fixture
+def universe():
+    with ReplayUniverse.synthetic(TICKERS).install() as universe:
+        yield universe
+
+
+def refresh(tmp_path, kinds, previous=None, tickers=TICKERS):
+    return refresh_snapshot(tickers, kinds, previous, snapshot_dir=str(tmp_path / 'snapshots'),
+                            cache_path=str(tmp_path / 'cache.sqlite'), requests_per_second=0)
+
+
+def test_refresh_cadence():
+    friday_close = datetime(2026, 10, 16, 16, 30, tzinfo=IST)
+    current = {'symbols': TICKERS, 'refreshed_at': {'prices': friday_close, 'fundamentals': friday_close}}
+    assert due_refreshes(None, TICKERS, friday_close) == ['prices', 'fundamentals']
+    assert due_refreshes(current, TICKERS, datetime(2026, 10, 18, 12, tzinfo=IST)) == []
+    assert due_refreshes(current, TICKERS, datetime(2026, 10, 19, 15, 59, tzinfo=IST)) == []
+    assert due_refreshes(current, TICKERS, datetime(2026, 10, 19, 16, 0, tzinfo=IST)) == ['prices']
+    assert due_refreshes(current, TICKERS, friday_close + timedelta(days=7)) == ['prices', 'fundamentals']
+    assert due_refreshes(current, TICKERS + ['NEW.NS'], friday_close) == ['prices']
+
+
+def test_refresh_ttls_expire_only_refreshed_datasets():
+    ttls = refresh_ttls(['prices'])
+    assert ttls['history'] == timedelta(0)
+    assert all(ttl > timedelta(days=365) for dataset, ttl in ttls.items() if dataset != 'history')
+
+
+def test_price_refresh_reuses_cached_fundamentals(tmp_path, universe):
+    first = refresh(tmp_path, ['prices', 'fundamentals'])
+    # The first refresh fetches every price series in one batch download
+    assert universe.downloads == [TICKERS] and universe.request_count('history') == 0
+    requests = universe.request_count()
+    second = refresh(tmp_path, ['prices'], first)
+    # The second only tops up the stored series, in one more batch download
+    assert universe.downloads == [TICKERS, TICKERS]
+    assert universe.request_count() - requests == 1 and universe.request_count('history') == 0
+    assert second['refreshed_at']['fundamentals'] == first['refreshed_at']['fundamentals']
+    assert second['refreshed_at']['prices'] > first['refreshed_at']['prices']
+    assert snapshot.current_version(str(tmp_path / 'snapshots')) == second['version']
+
+
+def test_failed_tickers_keep_previous_results(tmp_path, universe):
+    universe.data['DEAD.NS'] = dict.fromkeys(RECORDED_DATASETS, SimulatedHTTPError(404))
+    previous = {'results': {'DEAD.NS': TickerResult('DEAD.NS', latest_close=1.0)}}
+    current = refresh(tmp_path, ['prices', 'fundamentals'], previous, tickers=TICKERS + ['DEAD.NS'])
+    assert current['failed'] == ['DEAD.NS']
+    assert current['results']['DEAD.NS'] is previous['results']['DEAD.NS']
+    assert current['results'].keys() == set(TICKERS + ['DEAD.NS'])
+
+
+def test_snapshots_are_versioned_and_pruned(tmp_path):
+    directory = str(tmp_path)
+    versions = [snapshot.write_snapshot({'n': n}, directory) for n in range(snapshot.SNAPSHOT_KEEP + 2)]
+    assert snapshot.current_version(directory) == versions[-1]
+    assert snapshot.read_snapshot(directory=directory)['n'] == len(versions) - 1
+    assert sorted(path.name for path in tmp_path.glob('snapshot-*.pkl')) == \
+        [f"snapshot-{version}.pkl" for version in versions[-snapshot.SNAPSHOT_KEEP:]]
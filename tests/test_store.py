@@ -0,0 +1,16 @@
+"""Run store queries."""
+from results import TickerResult
+from store import RunStore
+
+
+def test_runs_lists_the_latest_first_up_to_a_limit(tmp_path):
+    store = RunStore(str(tmp_path / 'runs.sqlite'))
+    run_ids = [store.start_run() for _ in range(5)]
+    for run_id in run_ids:
+        store.append(run_id, TickerResult('SYM00.NS', latest_close=1.0))
+    store.append(run_ids[-1], TickerResult('SYM01.NS', latest_close=2.0))
+
+    runs = store.runs(limit=2)
+    assert runs['run_id'].tolist() == run_ids[:-3:-1]
+    assert runs['tickers'].tolist() == [2, 1]
+    assert len(store.runs()) == 5